@@ -1,3 +1,6 @@
+import os
+import sys
+
 import cv2
 from pathlib import Path
 from typing import Optional
@@ -5,6 +8,8 @@ from typing import Optional
 from src.neuro_video_core.core.video_core import VideoCore
 from src.neuro_video_core.settings import VideoCoreConfig
 from src.neuro_video_core.decoders.decoder_type import DecoderType
+from src.neuro_video_core.decoders.opencv_decoder import OpenCVDecoder
+from src.neuro_video_core.decoders.pyav_decoder import PyAVDecoder
 
 # Новый импорт
 from tools.timer import TimerManager
@@ -12,6 +17,14 @@ from tools.timer import TimerManager
 # Глобальный таймер для всех тестов
 TM = TimerManager()
 
+# Запуск без GUI (python run.py --no-display или NEURO_VIDEO_HEADLESS=1):
+# чистый замер декодирования, без imshow/waitKey, у которого минимальная задержка ~1 мс на кадр
+HEADLESS = os.environ.get("NEURO_VIDEO_HEADLESS") == "1"
+DISPLAY_ENABLED = "--no-display" not in sys.argv and not HEADLESS
+
+# При потоковом чтении показываем только каждый N-й кадр (~2 FPS для источника 30 FPS)
+DISPLAY_EVERY_N = 15
+
 
 # ============================================================
 #                    ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ
@@ -23,39 +36,92 @@ def _print_header(title: str):
     print("=" * 70)
 
 
-def _show_frame(window: str, frame, delay_ms: int = 1):
-    """Удобный показ кадра в отдельном окне."""
-    if frame is None:
-        return
+def _show_frame(window: str, frame, frame_index: Optional[int] = None, delay_ms: int = 1) -> bool:
+    """
+        Удобный показ кадра в отдельном окне.
+        frame_index задан — кадр показывается только если frame_index % DISPLAY_EVERY_N == 0.
+        delay_ms = 0 — без cv2.waitKey (вызывающий обновляет окно сам).
+        Возвращает True, если кадр был показан.
+    """
+    if frame is None or not DISPLAY_ENABLED:
+        return False
+    if frame_index is not None and frame_index % DISPLAY_EVERY_N != 0:
+        return False
+
     cv2.imshow(window, frame)
-    cv2.waitKey(delay_ms)
+    if delay_ms > 0:
+        cv2.waitKey(delay_ms)
+    return True
 
 
 def _print_seek_info(requested_frame: int, decoder_frame: int):
     print(f"Requested: {requested_frame:6d} | Decoder:  {decoder_frame:6d}")
 
 
+def warmup(path: str | Path):
+    """
+        Однократно открывает и закрывает декодер каждого бэкенда.
+        Загрузка библиотек FFmpeg/OpenCV-бэкендов и инициализация кодеков
+        происходят здесь, а не в первом замеряемом тесте.
+    """
+    config = VideoCoreConfig()
+    for decoder_cls in (OpenCVDecoder, PyAVDecoder):
+        decoder = decoder_cls(path, config)
+        decoder.open()
+        decoder.close()
+
+
 # ============================================================
 #                   ФУНКЦИИ ТЕСТОВ (с таймерами)
 # ============================================================
 
-def test_sync_read(core: VideoCore, window: str, max_frames: int, label: str):
+def test_sync_read(core: VideoCore, window: str, max_frames: int, label: str, sample_every: int = 1):
+    """
+        Последовательное чтение: grab() на каждом кадре,
+        retrieve() + показ только на каждом sample_every-м.
+    """
     _print_header(f"{label} — Sync reading")
 
     with TM.timer(f"{label}_sync_read"):
         count = 0
         while True:
-            frame = core.get_frame()
-            if frame is None:
+            if not core.grab():
                 break
 
-            _show_frame(window, frame, delay_ms=1)
+            if count % sample_every == 0:
+                # Одно обновление окна на показанный кадр
+                if _show_frame(window, core.retrieve(), frame_index=count, delay_ms=0):
+                    cv2.waitKey(1)
 
             count += 1
             if count >= max_frames:
                 break
 
 
+def test_batch_read(core: VideoCore, window: str, max_frames: int, label: str, batch_size: int = 16):
+    """
+        Пакетное чтение: core.read_batch() декодирует кадры прямо в один массив,
+        который переиспользуется между пакетами (без Python-вызова на каждый кадр).
+    """
+    _print_header(f"{label} — Batch reading")
+
+    with TM.timer(f"{label}_batch_read"):
+        # Первый пакет выделяет массив (batch_size, H, W, C), дальше он переиспользуется
+        out = core.read_batch(min(batch_size, max_frames))
+        count = 0
+        batch = out
+        while batch is not None and len(batch) > 0:
+            if _show_frame(window, batch[-1], delay_ms=0):
+                cv2.waitKey(1)
+
+            count += len(batch)
+            if count >= max_frames or len(batch) < len(out):
+                break
+
+            n = min(len(out), max_frames - count)
+            batch = core.read_batch(n, out=out)
+
+
 def test_async_read(core: VideoCore, window: str, max_frames: int, label: str):
     _print_header(f"{label} — Async reading")
 
@@ -64,11 +130,18 @@ def test_async_read(core: VideoCore, window: str, max_frames: int, label: str):
     with TM.timer(f"{label}_async_read"):
         count = 0
         while True:
-            frame = core.get_last_async_frame()
+            # Ждём новый кадр, не нагружая ядро активным опросом
+            frame = core.get_last_async_frame(blocking=True)
             if frame is None:
-                continue
-
-            _show_frame(window, frame, delay_ms=1)
+                if core.is_async_running():
+                    # Таймаут ожидания (долгое декодирование) — поток ещё читает
+                    continue
+                # Поток остановился — забираем кадр, записанный перед остановкой, если он есть
+                frame = core.get_last_async_frame(blocking=True, timeout=0.0)
+                if frame is None:
+                    break
+
+            _show_frame(window, frame, frame_index=count, delay_ms=1)
             count += 1
 
             if count >= max_frames:
@@ -77,13 +150,14 @@ def test_async_read(core: VideoCore, window: str, max_frames: int, label: str):
     core.stop_async()
 
 
-def test_seek_accuracy(core: VideoCore, window: str, frames_to_test: list[int], label: str):
+def test_seek_accuracy(core: VideoCore, window: str, frames_to_test: list[int], label: str, keyframe_only: bool = False):
+    """ keyframe_only=True — режим скраббинга: seek до ближайшего keyframe. """
     _print_header(f"{label} — Seek accuracy")
 
     for idx in frames_to_test:
 
         with TM.timer(f"{label}_seek"):
-            ok = core.go_to_frame(idx)
+            ok = core.go_to_frame(idx, keyframe_only=keyframe_only)
 
         if not ok:
             print(f"Seek failed for frame {idx}")
@@ -96,6 +170,18 @@ def test_seek_accuracy(core: VideoCore, window: str, frames_to_test: list[int],
         _print_seek_info(idx, decoder_pos)
 
 
+def test_sample_frames(core: VideoCore, window: str, frames_to_test: list[int], label: str):
+    """ Разреженная выборка кадров за один вызов core.sample_frames(). """
+    _print_header(f"{label} — Sample frames")
+
+    with TM.timer(f"{label}_sample"):
+        frames = core.sample_frames(frames_to_test)
+
+    for idx, frame in zip(frames_to_test, frames):
+        print(f"Requested: {idx:6d} | Frame: {'ok' if frame is not None else 'missing'}")
+        _show_frame(window, frame, delay_ms=200)
+
+
 def test_buffer(core: VideoCore, window: str, frames: int, label: str):
     _print_header(f"{label} — RingBuffer")
 
@@ -120,7 +206,8 @@ def run_tests(
     decoder: DecoderType,
     async_enabled: bool,
     buffer_size: int,
-    label: str
+    label: str,
+    sample_every: int = 1
 ):
     window = "NeuroVideoCore — Debug Runner"
 
@@ -139,18 +226,22 @@ def run_tests(
     print(f"FPS: {meta['fps']} | Total frames: {meta['total_frames']}")
 
     # Тесты
-    test_sync_read(core, window, max_frames=150, label=label)
+    test_sync_read(core, window, max_frames=150, label=label, sample_every=sample_every)
+    test_batch_read(core, window, max_frames=150, label=label)
 
     if async_enabled:
         test_async_read(core, window, max_frames=150, label=label)
 
     test_seek_accuracy(core, window, frames_to_test=[0, 5, 10, 25, 100, 150], label=label)
+    test_seek_accuracy(core, window, frames_to_test=[0, 5, 10, 25, 100, 150], label=f"{label}_scrub", keyframe_only=True)
+    test_sample_frames(core, window, frames_to_test=[0, 5, 10, 25, 100, 150], label=label)
 
     if buffer_size > 0:
         test_buffer(core, window, frames=50, label=label)
 
     core.close()
-    cv2.destroyAllWindows()
+    if DISPLAY_ENABLED:
+        cv2.destroyAllWindows()
 
 
 # ============================================================
@@ -161,6 +252,9 @@ if __name__ == "__main__":
 
     PATH = r"w:\MATLLER\cherkiz\REVISION_9\ml_cam101_05112025_1400.avi"
 
+    # Декодировать (retrieve) только каждый N-й кадр при последовательном чтении
+    SAMPLE_EVERY = 15
+
     # ---------------------------------------------------------
     # СПИСОК КОНФИГУРАЦИЙ ДЛЯ АВТОМАТИЧЕСКОГО ЗАПУСКА
     # ---------------------------------------------------------
@@ -168,23 +262,32 @@ if __name__ == "__main__":
     CONFIGS = [
         # Hybrid
         {"decoder": DecoderType.HYBRID, "async_enabled": False, "buffer_size": 0,  "label": "Hybrid_sync"},
-        {"decoder": DecoderType.HYBRID, "async_enabled": False, "buffer_size": 50, "label": "Hybrid_buffer"},
+        {"decoder": DecoderType.HYBRID, "async_enabled": False, "buffer_size": 64, "label": "Hybrid_buffer"},
         {"decoder": DecoderType.HYBRID, "async_enabled": True,  "buffer_size": 0,  "label": "Hybrid_async"},
-        {"decoder": DecoderType.HYBRID, "async_enabled": True, "buffer_size": 50, "label": "Hybrid_async_buffer"},
+        {"decoder": DecoderType.HYBRID, "async_enabled": True, "buffer_size": 64, "label": "Hybrid_async_buffer"},
 
         # OpenCV
         {"decoder": DecoderType.OPENCV, "async_enabled": False, "buffer_size": 0,  "label": "OpenCV_sync"},
-        {"decoder": DecoderType.OPENCV, "async_enabled": False, "buffer_size": 50, "label": "OpenCV_buffer"},
+        {"decoder": DecoderType.OPENCV, "async_enabled": False, "buffer_size": 64, "label": "OpenCV_buffer"},
         {"decoder": DecoderType.OPENCV, "async_enabled": True, "buffer_size": 0, "label": "OpenCV_async"},
-        {"decoder": DecoderType.OPENCV, "async_enabled": True, "buffer_size": 50, "label": "OpenCV_async_buffer"},
+        {"decoder": DecoderType.OPENCV, "async_enabled": True, "buffer_size": 64, "label": "OpenCV_async_buffer"},
 
         # PyAV
         {"decoder": DecoderType.PYAV, "async_enabled": False, "buffer_size": 0,  "label": "PyAV_sync"},
-        {"decoder": DecoderType.PYAV, "async_enabled": False, "buffer_size": 50, "label": "PyAV_buffer"},
+        {"decoder": DecoderType.PYAV, "async_enabled": False, "buffer_size": 64, "label": "PyAV_buffer"},
         {"decoder": DecoderType.PYAV, "async_enabled": True, "buffer_size": 0, "label": "PyAV_async"},
-        {"decoder": DecoderType.PYAV, "async_enabled": True, "buffer_size": 50, "label": "PyAV_async_buffer"},
+        {"decoder": DecoderType.PYAV, "async_enabled": True, "buffer_size": 64, "label": "PyAV_async_buffer"},
     ]
 
+    # ---------------------------------------------------------
+    # Прогрев: одноразовые затраты не попадают в замеры
+    # ---------------------------------------------------------
+
+    with TM.timer("warmup"):
+        warmup(PATH)
+    TM.print_summary()
+    TM.reset()
+
     # ---------------------------------------------------------
     # Запуск всех тестов подряд
     # ---------------------------------------------------------
@@ -195,7 +298,8 @@ if __name__ == "__main__":
             decoder=cfg["decoder"],
             async_enabled=cfg["async_enabled"],
             buffer_size=cfg["buffer_size"],
-            label=cfg["label"]
+            label=cfg["label"],
+            sample_every=SAMPLE_EVERY
         )
 
     # ---------------------------------------------------------
@@ -1,65 +1,180 @@
+import ctypes
+import os
+import sys
 import threading
-import time
-from typing import Optional, Any
+import warnings
+from typing import Optional, Any, Callable
+
+import numpy as np
+
+from .spsc_ring import SpscRing
 
 
 class AsyncFrameReader:
     """
         Асинхронный читатель кадров.
         Запускает отдельный поток, который постоянно вызывает
-        decoder.read() и сохраняет последний успешный кадр.
+        read_fn() (по умолчанию decoder.read()) и складывает кадры
+        в SPSC-очередь (см. SpscRing).
+
+        Потребитель может:
+        * брать самый свежий кадр — get_last();
+        * забирать кадры по порядку без пропусков — get_next().
+
+        Кадры копируются в предвыделенные слоты очереди. get_last() возвращает
+        view на слот — он перезаписывается через capacity - 1 новых кадров,
+        для долгого хранения нужен .copy(). get_next() возвращает копию кадра.
     """
 
-    def __init__(self, decoder: Any, poll_delay: float = 0.0):
+    def __init__(
+        self,
+        decoder: Any,
+        poll_delay: float = 0.0,
+        read_fn: Optional[Callable[[], Any]] = None,
+        capacity: int = 4,
+        cpu: Optional[int] = None,
+    ):
         """
             :param decoder: декодер, реализующий BaseDecoder
             :param poll_delay: задержка между попытками чтения (обычно 0)
+            :param read_fn: функция чтения кадра (по умолчанию decoder.read)
+            :param capacity: ёмкость очереди кадров (>= 2, округляется до степени двойки)
+            :param cpu: CPU, к которому привязывается поток чтения (None — без привязки)
         """
         self._decoder = decoder
         self._poll_delay = poll_delay
+        self._read_fn: Callable[[], Any] = read_fn or decoder.read
+        self._cpu = cpu
 
-        self._last_frame: Optional[Any] = None
-        self._running: bool = False
+        self._ring = SpscRing(max(capacity, 2))
+        self._stop_event = threading.Event()
+        # Взводится писателем после каждого нового кадра
+        self._new_frame = threading.Event()
         self._thread: Optional[threading.Thread] = None
 
     def start(self) -> None:
         """ Запускает поток чтения кадров. """
-        if self._running:
+        if self.is_running():
+            if self._stop_event.is_set():
+                # Прошлый поток ещё не вышел из read() — второй читатель того же декодера недопустим
+                warnings.warn("AsyncFrameReader: previous reader thread is still stopping, not restarted")
             return
 
-        self._running = True
+        self._ring.reset()
+        self._stop_event.clear()
+        self._new_frame.clear()
+
+        # Прогрев: первый кадр читаем синхронно — по его форме выделяются слоты очереди,
+        # и get_last() сразу после start() уже возвращает кадр
+        frame = self._read()
+        if frame is None:
+            return
+
+        if isinstance(frame, np.ndarray):
+            self._ring.allocate(frame.shape, frame.dtype)
+        self._ring.push(frame)
+        self._new_frame.set()
+
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
         """ Останавливает поток. """
-        self._running = False
+        self._stop_event.set()
 
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=1.0)
 
-        self._thread = None
+        # Поток, застрявший в read() (например, сетевой источник), не забываем:
+        # пока он жив, start() не запустит второго читателя того же декодера
+        if self._thread and not self._thread.is_alive():
+            self._thread = None
+
+    def is_running(self) -> bool:
+        """ True, если поток чтения ещё работает. """
+        return self._thread is not None and self._thread.is_alive()
 
     def _run(self) -> None:
         """ Основной цикл чтения кадров. """
-        while self._running:
-            try:
-                frame = self._decoder.read()
-            except Exception:
-                # не останавливаем приложение из-за ошибки декодера
-                frame = None
+        if self._cpu is not None:
+            _pin_current_thread(self._cpu)
+
+        stop_event = self._stop_event
+        new_frame = self._new_frame
+        ring = self._ring
+
+        while not stop_event.is_set():
+            frame = self._read()
 
             if frame is None:
                 # если кадры закончились — выходим
                 break
 
-            self._last_frame = frame
+            ring.push(frame)
+            new_frame.set()
 
             if self._poll_delay > 0:
-                time.sleep(self._poll_delay)
+                # ожидание прерывается сразу при stop()
+                stop_event.wait(self._poll_delay)
+
+    def _read(self) -> Optional[Any]:
+        """ Читает кадр через read_fn, подавляя ошибки декодера. """
+        try:
+            return self._read_fn()
+        except Exception:
+            # не останавливаем приложение из-за ошибки декодера
+            return None
+
+    def get_last(self, blocking: bool = False, timeout: float = 0.1):
+        """
+            Возвращает последний успешно прочитанный кадр.
+            :param blocking: True — ждать появления нового кадра (без активного опроса),
+                             отдавая GIL потоку декодирования
+            :param timeout: максимальное ожидание в секундах при blocking=True;
+                            если новый кадр не появился — возвращается None
+        """
+        if blocking:
+            if not self._new_frame.wait(timeout):
+                return None
+            self._new_frame.clear()
+        return self._ring.last()
+
+    def get_next(self):
+        """ Возвращает следующий непрочитанный кадр (FIFO) или None, если новых нет. """
+        return self._ring.pop()
 
-        self._running = False
 
-    def get_last(self):
-        """ Возвращает последний успешно прочитанный кадр. """
-        return self._last_frame
+def _pin_current_thread(cpu: int) -> None:
+    """
+        Привязывает вызывающий поток к CPU и повышает его приоритет,
+        чтобы декодирование не делило ядро с GUI-циклом (imshow/waitKey).
+        Ошибки не критичны — поток продолжает работать без привязки.
+    """
+    try:
+        if sys.platform == "win32":
+            from ctypes import wintypes
+
+            # use_last_error=True — иначе ctypes.get_last_error() всегда 0
+            kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+            kernel32.GetCurrentThread.restype = wintypes.HANDLE
+            kernel32.SetThreadAffinityMask.argtypes = (wintypes.HANDLE, ctypes.c_size_t)
+            kernel32.SetThreadAffinityMask.restype = ctypes.c_size_t
+
+            handle = kernel32.GetCurrentThread()
+            # Маска — DWORD_PTR: c_size_t, а не int по умолчанию (переполнение для cpu >= 31)
+            if not kernel32.SetThreadAffinityMask(handle, ctypes.c_size_t(1 << cpu)):
+                raise ctypes.WinError(ctypes.get_last_error())
+            # THREAD_PRIORITY_HIGHEST
+            kernel32.SetThreadPriority(handle, 2)
+        elif hasattr(os, "sched_setaffinity"):
+            # 0 — вызывающий поток (на Linux affinity задаётся на уровне потока)
+            os.sched_setaffinity(0, {cpu})
+            try:
+                # Повышение приоритета требует CAP_SYS_NICE — без него оставляем как есть
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -5)
+            except OSError:
+                pass
+        else:
+            warnings.warn("AsyncFrameReader: thread pinning is not supported on this platform")
+    except (OSError, ValueError, AttributeError, ctypes.ArgumentError) as e:
+        warnings.warn(f"AsyncFrameReader: cannot pin thread to CPU {cpu}: {e}")
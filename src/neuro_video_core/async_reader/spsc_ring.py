@@ -0,0 +1,146 @@
+from typing import Any, List, Optional
+
+import numpy as np
+
+
+class SpscRing:
+    """
+        Кольцевая очередь «один писатель — один читатель» (SPSC) без блокировок.
+
+        Назначение:
+        -----------
+        Передача кадров из потока AsyncFrameReader (писатель)
+        в основной поток (читатель) без mutex.
+
+        Устройство:
+        -----------
+        * ёмкость округляется вверх до степени двойки,
+          индекс слота вычисляется маской (counter & mask) вместо деления по модулю;
+        * _head — счётчик записанных элементов, меняет только писатель;
+        * _tail — счётчик прочитанных элементов, меняет только читатель;
+        * писатель сначала заполняет слот и только потом публикует новый _head,
+          поэтому читатель никогда не видит незаполненный слот.
+
+        В CPython присваивание атрибута атомарно (GIL), отдельные барьеры памяти не нужны.
+
+        Переполнение:
+        -------------
+        Писатель никогда не ждёт читателя. Читателю доступны не больше capacity - 1
+        последних элементов: слот head & mask писатель заполняет до публикации _head,
+        и читать его нельзя. Если читатель отстал сильнее, самые старые кадры
+        перезаписываются, и pop() продолжает с самого старого из доступных
+        (head - capacity + 1) — для live-видео важнее свежесть, чем полнота.
+
+        Предвыделенные слоты кадров:
+        ----------------------------
+        После allocate() кадры не хранятся по ссылке, а копируются в заранее
+        выделенный непрерывный массив (capacity, *frame_shape). Писатель всегда
+        пишет в слот head & mask, а опубликованный последним кадр лежит в слоте
+        (head - 1) & mask — при capacity >= 2 это «двойной буфер» с атомарной
+        сменой активного индекса: last() всегда отдаёт целиком записанный кадр.
+        last() возвращает view на слот — он перезаписывается через capacity - 1
+        новых кадров, поэтому для долгого хранения нужен .copy().
+        pop() возвращает копию: при отставании читателя его слот может оказаться
+        следующим на запись у писателя.
+    """
+
+    def __init__(self, capacity: int):
+        """
+            :param capacity: желаемая ёмкость (округляется до степени двойки)
+        """
+        if capacity <= 0:
+            raise ValueError("SpscRing capacity must be > 0")
+
+        self._capacity = 1 << (capacity - 1).bit_length()
+        self._mask = self._capacity - 1
+        self._slots: List[Optional[Any]] = [None] * self._capacity
+        self._head = 0
+        self._tail = 0
+
+        # Предвыделенное хранилище кадров (см. allocate)
+        self._frames: Optional[np.ndarray] = None
+        self._frame_views: Optional[List[np.ndarray]] = None
+        self._frame_shape: Optional[tuple[int, ...]] = None
+
+    def allocate(self, frame_shape: tuple[int, ...], dtype: np.dtype = np.uint8) -> None:
+        """
+            Выделяет непрерывное хранилище под capacity кадров заданной формы.
+            Вызывать только когда поток-писатель остановлен.
+        """
+        if self._capacity < 2:
+            raise ValueError("SpscRing frame slots require capacity >= 2")
+
+        self._frame_shape = tuple(frame_shape)
+        self._frames = np.empty((self._capacity,) + self._frame_shape, dtype=dtype)
+        self._frame_views = list(self._frames)
+
+    # ---------------------------------------------------------
+    # Writer side
+    # ---------------------------------------------------------
+
+    def push(self, item: Any) -> None:
+        """ Записывает элемент. Вызывается только потоком-писателем. """
+        head = self._head
+        index = head & self._mask
+
+        views = self._frame_views
+        if views is not None and getattr(item, "shape", None) == self._frame_shape:
+            # Копируем в предвыделенный слот — без удержания нового объекта кадра
+            slot = views[index]
+            np.copyto(slot, item)
+            self._slots[index] = slot
+        else:
+            self._slots[index] = item
+
+        # Публикация после записи слота
+        self._head = head + 1
+
+    # ---------------------------------------------------------
+    # Reader side
+    # ---------------------------------------------------------
+
+    def pop(self) -> Optional[Any]:
+        """
+            Извлекает самый старый непрочитанный элемент или None, если очередь пуста.
+            Кадр из предвыделенного слота возвращается копией — писатель может
+            перезаписать этот слот следующим же push().
+        """
+        head = self._head
+        tail = self._tail
+        if tail == head:
+            return None
+
+        # Писатель обогнал читателя — пропускаем перезаписанное и слот,
+        # который он заполняет сейчас (head & mask)
+        if head - tail >= self._capacity:
+            tail = head - self._capacity + 1
+
+        item = self._slots[tail & self._mask]
+        if self._frame_views is not None and isinstance(item, np.ndarray):
+            item = item.copy()
+        self._tail = tail + 1
+        return item
+
+    def last(self) -> Optional[Any]:
+        """ Возвращает самый свежий элемент, не извлекая его. """
+        head = self._head
+        if head == 0:
+            return None
+        return self._slots[(head - 1) & self._mask]
+
+    def size(self) -> int:
+        """ Количество непрочитанных элементов. """
+        return min(self._head - self._tail, self._capacity - 1)
+
+    def capacity(self) -> int:
+        """ Фактическая ёмкость (степень двойки). """
+        return self._capacity
+
+    def reset(self) -> None:
+        """
+            Полная очистка. Вызывать только когда поток-писатель остановлен.
+            Выделенное хранилище кадров сохраняется.
+        """
+        self._slots = [None] * self._capacity
+        self._head = 0
+        self._tail = 0
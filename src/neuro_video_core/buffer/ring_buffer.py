@@ -1,41 +1,81 @@
-from typing import Optional, List, Any
+import warnings
+from typing import Optional
+
+import numpy as np
 
 
 class RingBuffer:
     """
-        Кольцевой буфер фиксированной ёмкости.
-        Хранит последние N элементов.
+        Кольцевой буфер кадров фиксированной ёмкости.
+        Хранит последние N кадров.
         Индексация:
             0           → самый старый элемент
             size - 1    → самый новый элемент
+
+        Хранилище:
+        ----------
+        Все кадры лежат в одном заранее выделенном непрерывном массиве
+        формы (capacity, *frame_shape). push() копирует кадр в свободный слот,
+        поэтому новых аллокаций на каждый кадр нет.
+        Ёмкость округляется вверх до степени двойки: индекс слота
+        вычисляется маской (& mask) вместо деления по модулю.
+
+        Абсолютные индексы:
+        -------------------
+        Вместе с кадром можно сохранить его абсолютный индекс в видео (push(frame, absolute_id)),
+        после чего кадр ищется по индексу без повторного декодирования — peek_by_absolute().
+
+        Важно:
+        ------
+        get() и last возвращают view на слот буфера (без копирования).
+        После ещё capacity вызовов push() слот будет перезаписан —
+        если кадр нужен дольше, вызывающий код должен сделать .copy().
     """
 
-    def __init__(self, capacity: int):
+    def __init__(self, capacity: int, frame_shape: tuple[int, ...], dtype: np.dtype = np.uint8):
         """
-            :param capacity: максимальное количество элементов в буфере
+            :param capacity: максимальное количество элементов в буфере (округляется до степени двойки)
+            :param frame_shape: форма одного кадра, например (H, W, 3)
+            :param dtype: тип элементов кадра
         """
         if capacity <= 0:
             raise ValueError("RingBuffer capacity must be > 0")
 
-        self._capacity = capacity
-        self._data: List[Optional[Any]] = [None] * capacity
+        self._capacity = 1 << (capacity - 1).bit_length()
+        self._mask = self._capacity - 1
+        if self._capacity != capacity:
+            warnings.warn(
+                f"RingBuffer: capacity {capacity} is not a power of two, rounded up to {self._capacity}"
+            )
+        self._frame_shape = tuple(frame_shape)
+        self._data: np.ndarray = np.empty((self._capacity,) + self._frame_shape, dtype=dtype)
+        # Абсолютный индекс кадра в каждом слоте (-1 — неизвестен / слот пуст)
+        self._ids: np.ndarray = np.full(self._capacity, -1, dtype=np.int64)
         self._size = 0
         self._start = 0  # индекс самого старого элемента
         self._end = 0    # позиция для записи нового элемента
 
-    def push(self, item: Any) -> None:
-        """ Добавляет элемент в буфер. """
-        self._data[self._end] = item
+    def push(self, item: np.ndarray, absolute_id: int = -1) -> None:
+        """
+            Копирует кадр в буфер.
+            :param absolute_id: индекс кадра в видео (-1 — не отслеживается)
+        """
+        if item.shape != self._frame_shape:
+            raise ValueError(f"RingBuffer: frame shape {item.shape} does not match {self._frame_shape}")
+
+        end = self._end
+        np.copyto(self._data[end], item)
+        self._ids[end] = absolute_id
 
         if self._size < self._capacity:
             self._size += 1
         else:
             # буфер заполнен — сдвигаем начало
-            self._start = (self._start + 1) % self._capacity
+            self._start = (self._start + 1) & self._mask
 
-        self._end = (self._end + 1) % self._capacity
+        self._end = (end + 1) & self._mask
 
-    def get(self, frame_index: int) -> Optional[Any]:
+    def get(self, frame_index: int) -> Optional[np.ndarray]:
         """
             Возвращает элемент по логическому индексу.
             0 → самый старый
@@ -44,28 +84,64 @@ class RingBuffer:
         if frame_index < 0 or frame_index >= self._size:
             return None
 
-        real_index = (self._start + frame_index) % self._capacity
+        real_index = (self._start + frame_index) & self._mask
         return self._data[real_index]
 
-    def last(self) -> Optional[Any]:
-        """ Возвращает самый новый элемент. """
+    @property
+    def last(self) -> Optional[np.ndarray]:
+        """ Самый новый элемент (None, если буфер пуст). """
         if self._size == 0:
             return None
 
-        last_index = (self._end - 1 + self._capacity) % self._capacity
+        last_index = (self._end - 1) & self._mask
         return self._data[last_index]
 
+    def peek_by_absolute(self, absolute_id: int) -> Optional[np.ndarray]:
+        """
+            Возвращает кадр с указанным абсолютным индексом, не извлекая его, или None.
+            Если кадры в буфер клались подряд (обычное чтение) — поиск O(1),
+            иначе — линейный проход по индексам.
+        """
+        if self._size == 0 or absolute_id < 0:
+            return None
+
+        # Быстрый путь: индексы в буфере идут подряд от самого старого
+        offset = absolute_id - int(self._ids[self._start])
+        if 0 <= offset < self._size:
+            real_index = (self._start + offset) & self._mask
+            if self._ids[real_index] == absolute_id:
+                return self._data[real_index]
+
+        hits = np.flatnonzero(self._ids == absolute_id)
+        if hits.size == 0:
+            return None
+        return self._data[hits[0]]
+
+    def id_range(self) -> Optional[tuple[int, int]]:
+        """ Минимальный и максимальный абсолютный индекс кадров в буфере или None. """
+        valid = self._ids[self._ids >= 0]
+        if valid.size == 0:
+            return None
+        return int(valid.min()), int(valid.max())
+
+    @property
     def size(self) -> int:
         """ Количество элементов в буфере. """
         return self._size
 
+    @property
     def capacity(self) -> int:
         """ Максимальная вместимость буфера. """
         return self._capacity
 
+    @property
+    def frame_shape(self) -> tuple[int, ...]:
+        """ Форма кадра, под которую выделено хранилище. """
+        return self._frame_shape
+
     def clear(self) -> None:
-        """ Очищает буфер. """
-        self._data = [None] * self._capacity
+        """ Очищает буфер. Память хранилища сохраняется для повторного использования. """
+        self._ids.fill(-1)
         self._size = 0
         self._start = 0
         self._end = 0
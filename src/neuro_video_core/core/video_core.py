@@ -1,5 +1,8 @@
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
+
+import numpy as np
 
 from ..decoders.base_decoder import BaseDecoder
 from ..decoders import DecoderFactory
@@ -9,6 +12,11 @@ from ..async_reader.async_frame_reader import AsyncFrameReader
 from ..exceptions import VideoOpenError
 
 
+# Маркер, который get_frame(decode=False) возвращает вместо кадра:
+# кадр пропущен через grab(), но не декодирован.
+FRAME_GRABBED = object()
+
+
 class VideoCore:
     """
         Центральное видео-ядро.
@@ -18,9 +26,25 @@ class VideoCore:
         * чтение кадров (sync/async);
         * переходы по кадрам;
         * поддержка буфера;
+        * упреждающее чтение (prefetch) в буфер;
         * получение метаданных.
 
         Источником истины о положении в видео является сам декодер.
+
+        Повтор из буфера:
+        -----------------
+        Если buffer_size > 0 и go_to_frame() попадает на кадр, который уже есть в буфере,
+        seek не выполняется: get_frame() отдаёт кадры из буфера, пока они там есть,
+        и только потом возвращается к декодеру. Переход за пределы диапазона
+        кадров в буфере очищает его.
+
+        Prefetch (config.prefetch_enabled):
+        ------------------------------------
+        Вокруг текущей позиции держится окно декодированных кадров размером buffer_size:
+        front_back_ratio окна — впереди (дочитывается фоновым потоком после каждого кадра),
+        остальное — позади (заполняется при переходе: seek выполняется на window_behind
+        кадров раньше цели). Переход и чтение внутри окна обслуживаются из буфера без seek
+        и декодирования. Позицию в этом режиме задаёт курсор VideoCore, а не декодер.
     """
 
     def __init__(self, source: str | Path | BaseDecoder, config: Optional[VideoCoreConfig] = None):
@@ -33,16 +57,39 @@ class VideoCore:
             factory = DecoderFactory(self._config)
             self._decoder = factory.create(source)
 
-        # Буфер
-        self._buffer: Optional[RingBuffer] = (
-            RingBuffer(self._config.buffer_size)
-            if self._config.buffer_size > 0
-            else None
-        )
+        # Метаданные, зафиксированные при open()
+        self._metadata: Optional[dict] = None
+
+        # Буфер: хранилище выделяется по форме первого прочитанного кадра
+        self._buffer: Optional[RingBuffer] = None
+
+        # Prefetch
+        self._prefetch_enabled = self._config.prefetch_enabled
+        if self._prefetch_enabled:
+            if self._config.buffer_size <= 0:
+                raise ValueError("VideoCore: prefetch requires buffer_size > 0")
+            if self._config.async_enabled:
+                raise ValueError("VideoCore: prefetch cannot be combined with async_enabled")
+
+        window = self._config.buffer_size
+        self._window_ahead = min(window, max(1, int(window * self._config.front_back_ratio)))
+        self._window_behind = window - self._window_ahead
+
+        # Абсолютный индекс кадра, который get_frame() отдаст из буфера вместо декодера
+        # (None — позиция совпадает с позицией декодера)
+        self._replay_cursor: Optional[int] = None
+
+        # Абсолютный индекс кадра, который вернёт следующий get_frame() в режиме prefetch
+        self._cursor: int = 0
+        self._prefetched_grab = None
+        self._decoder_lock = threading.Lock()
+        self._prefetch_wakeup = threading.Event()
+        self._prefetch_stop = threading.Event()
+        self._prefetch_thread: Optional[threading.Thread] = None
 
         # Async-reader
         self._async_reader: Optional[AsyncFrameReader] = (
-            AsyncFrameReader(self._decoder)
+            AsyncFrameReader(self._decoder, read_fn=self._decoder.read_async, cpu=self._config.async_cpu)
             if self._config.async_enabled
             else None
         )
@@ -56,18 +103,42 @@ class VideoCore:
         if not self._decoder.open():
             raise VideoOpenError(f"VideoCore: cannot open decoder for source: {self._decoder}")
 
+        # Метаданные не меняются после open() — считаем их один раз
+        fps = self._decoder.fps
+        total_frames = self._decoder.total_frames
+        self._metadata = {
+            "fps": float(fps) if fps else 0.0,
+            "total_frames": int(total_frames) if total_frames else 0,
+        }
+
+        if self._prefetch_enabled:
+            self._start_prefetch()
+
     def close(self) -> None:
-        """ Закрывает декодер и останавливает async-поток. """
+        """ Закрывает декодер и останавливает async-поток и prefetch. """
         if self._async_reader:
             self._async_reader.stop()
-        self._decoder.close()
+        self._stop_prefetch()
+        # Под блокировкой: prefetch-поток, не успевший выйти, мог остаться внутри чтения
+        with self._decoder_lock:
+            self._decoder.close()
+        self._replay_cursor = None
+        if self._buffer:
+            self._buffer.clear()
+        self._metadata = None
 
     # ---------------------------------------------------------
     # Metadata
     # ---------------------------------------------------------
 
     def get_metadata(self) -> dict:
-        """ Возвращает FPS и количество кадров из декодера. """
+        """
+            Возвращает FPS и количество кадров.
+            После open() — копия закэшированного словаря; до open() — значения декодера как есть.
+        """
+        if self._metadata is not None:
+            return self._metadata.copy()
+
         return {
             "fps": self._decoder.fps,
             "total_frames": self._decoder.total_frames,
@@ -77,51 +148,348 @@ class VideoCore:
     # Navigation
     # ---------------------------------------------------------
 
-    def go_to_frame(self, frame_index: int) -> bool:
+    def go_to_frame(self, frame_index: int, *, keyframe_only: bool = False) -> bool:
         """
             Переходит на указанный кадр.
+            :param keyframe_only: разрешить остановку на ближайшем keyframe (быстрый скраббинг)
             Возвращает:
             True  — если переход успешен,
             False — если seek не выполнен.
+
+            В режиме prefetch переход внутри окна буфера не вызывает seek декодера,
+            а сам переход всегда точный (keyframe_only не влияет на результат).
         """
-        return self._decoder.seek(frame_index)
+        frame_index = self._decoder.clamp_frame_index(frame_index)
+
+        if not self._prefetch_enabled:
+            if self._buffer is not None:
+                # Кадр уже декодирован — seek не нужен
+                if self._buffer.peek_by_absolute(frame_index) is not None:
+                    self._replay_cursor = frame_index
+                    return True
+                self._invalidate_buffer(frame_index)
+
+            self._replay_cursor = None
+            return self._decoder.seek(frame_index, keyframe_only=keyframe_only)
+
+        with self._decoder_lock:
+            if self._buffer is None or self._buffer.peek_by_absolute(frame_index) is None:
+                self._invalidate_buffer(frame_index)
+                # Начинаем на window_behind кадров раньше — они попадут в буфер
+                # при декодировании вперёд до цели (см. _read_at_cursor)
+                start = max(0, frame_index - self._window_behind)
+                if not self._decoder.seek(start, keyframe_only=True):
+                    return False
+            self._cursor = frame_index
+
+        self._prefetch_wakeup.set()
+        return True
 
     def get_decoder_frame_id(self) -> int:
-        """ Возвращает реальную позицию декодера. """
+        """
+            Возвращает реальную позицию декодера.
+            В режиме prefetch — позицию курсора VideoCore (декодер может быть впереди).
+        """
+        if self._prefetch_enabled:
+            return self._cursor
+        if self._replay_cursor is not None:
+            return self._replay_cursor
         return self._decoder.cur_frame_id()
 
     # ---------------------------------------------------------
     # Reading
     # ---------------------------------------------------------
 
-    def get_frame(self):
-        """ Читает один кадр из декодера. При успехе добавляет его в буфер. """
+    def get_frame(self, decode: bool = True):
+        """
+            Читает один кадр из декодера. При успехе добавляет его в буфер.
+            :param decode: False — только продвинуть декодер (grab) без декодирования;
+                           тогда вместо кадра возвращается FRAME_GRABBED (или None в конце видео).
+        """
+        if not decode:
+            return FRAME_GRABBED if self.grab() else None
+
+        if self._prefetch_enabled:
+            with self._decoder_lock:
+                frame = self._read_at_cursor()
+            self._prefetch_wakeup.set()
+            return frame
+
+        if self._replay_cursor is not None:
+            frame = self._read_replay()
+            if frame is not None:
+                return frame
+
         frame = self._decoder.read()
-        if frame is not None and self._buffer:
-            self._buffer.push(frame)
+        if frame is not None:
+            self._buffer_frame(frame, self._decoder.cur_frame_id() - 1)
+        return frame
+
+    def read_batch(self, count: int, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+            Читает до count кадров подряд в один массив (count, H, W, C).
+            Кадры декодируются прямо в out (если декодер это умеет) —
+            без отдельного объекта-кадра и Python-вызова get_frame() на каждый кадр.
+
+            :param out: предвыделенный массив для повторного использования (len(out) >= count);
+                        если None — создаётся по форме первого кадра.
+            :return: view out[:k] с прочитанными кадрами (k < count — конец видео);
+                     None, если out не передан и не прочитано ни одного кадра.
+            pix_fmt "raw" (av.VideoFrame) не поддерживается — кадры не ndarray;
+            для них — get_frame() / sample_frames().
+        """
+        if self._config.pix_fmt == "raw":
+            raise ValueError("VideoCore: read_batch requires ndarray frames; pix_fmt 'raw' is not supported")
+        if count <= 0:
+            raise ValueError(f"VideoCore: read_batch count must be > 0, got {count}")
+
+        start = 0
+        if out is None:
+            first = self.get_frame()
+            if first is None:
+                return None
+            out = np.empty((count,) + first.shape, dtype=first.dtype)
+            out[0] = first
+            start = 1
+
+        # Кадры из кэша буфера отдаёт только get_frame()
+        if self._prefetch_enabled or self._replay_cursor is not None:
+            read = start
+            while read < count:
+                frame = self.get_frame()
+                if frame is None:
+                    break
+                out[read] = frame
+                read += 1
+            return out[:read]
+
+        read = self._decoder.read_batch(out[start:count])
+        if read and self._config.buffer_size > 0:
+            first_id = self._decoder.cur_frame_id() - read
+            for i in range(read):
+                self._buffer_frame(out[start + i], first_id + i)
+
+        return out[:start + read]
+
+    def sample_frames(self, indices: Iterable[int]) -> list[Optional[np.ndarray]]:
+        """
+            Читает набор разреженных кадров за один проход (см. BaseDecoder.sample):
+            стоимость зависит от числа запрошенных кадров, а не от длины видео.
+            После вызова декодер стоит за последним (наибольшим) из прочитанных кадров.
+            :return: кадры в порядке indices (None — кадр прочитать не удалось).
+        """
+        if self._prefetch_enabled:
+            # Окно prefetch само обслуживает переходы — по одному кадру
+            indices = list(indices)
+            frames = {}
+            for frame_index in sorted(set(indices)):
+                frames[frame_index] = self.get_frame() if self.go_to_frame(frame_index) else None
+            return [frames[frame_index] for frame_index in indices]
+
+        self._replay_cursor = None
+        return self._decoder.sample(indices)
+
+    def grab(self) -> bool:
+        """
+            Переходит к следующему кадру без декодирования в BGR.
+            В режиме prefetch кадры уже декодированы — grab() берёт кадр из буфера.
+        """
+        if self._prefetch_enabled:
+            self._prefetched_grab = self.get_frame()
+            return self._prefetched_grab is not None
+
+        self._sync_decoder_to_replay()
+        return self._decoder.grab()
+
+    def retrieve(self):
+        """ Декодирует кадр, захваченный grab(). При успехе добавляет его в буфер. """
+        if self._prefetch_enabled:
+            return self._prefetched_grab
+
+        frame = self._decoder.retrieve()
+        if frame is not None:
+            self._buffer_frame(frame, self._decoder.cur_frame_id() - 1)
         return frame
 
     # ---------------------------------------------------------
     # Buffer
     # ---------------------------------------------------------
 
+    def _buffer_frame(self, frame, absolute_id: int = -1) -> None:
+        """
+            Копирует кадр в буфер (если buffer_size > 0).
+            RingBuffer создаётся лениво — при первом кадре, когда известна его форма;
+            при смене разрешения источника буфер пересоздаётся.
+            :param absolute_id: индекс кадра в видео
+        """
+        if self._config.buffer_size <= 0 or not isinstance(frame, np.ndarray):
+            # Буфер хранит только ndarray (не, например, av.VideoFrame при pix_fmt="raw")
+            return
+
+        if self._buffer is None or self._buffer.frame_shape != frame.shape:
+            self._buffer = RingBuffer(self._config.buffer_size, frame.shape, frame.dtype)
+
+        self._buffer.push(frame, absolute_id)
+
+    def _read_replay(self):
+        """
+            Отдаёт копию кадра под _replay_cursor из буфера без декодирования.
+            Если кадра в буфере нет — возвращает декодер на позицию курсора и None.
+        """
+        cursor = self._replay_cursor
+        cached = self._buffer.peek_by_absolute(cursor) if self._buffer else None
+        if cached is None:
+            self._sync_decoder_to_replay()
+            return None
+
+        cursor += 1
+        # Догнали декодер — дальше читаем из него
+        self._replay_cursor = cursor if cursor != self._decoder.cur_frame_id() else None
+        # Копия: слот буфера будет перезаписан следующими кадрами
+        return cached.copy()
+
+    def _sync_decoder_to_replay(self) -> None:
+        """ Переводит декодер на позицию _replay_cursor (если позиции разошлись). """
+        cursor = self._replay_cursor
+        if cursor is None:
+            return
+
+        self._replay_cursor = None
+        if self._decoder.cur_frame_id() != cursor:
+            self._decoder.seek(cursor)
+
+    def _invalidate_buffer(self, frame_index: int) -> None:
+        """ Очищает буфер, если frame_index вне диапазона закэшированных кадров. """
+        if self._buffer is None:
+            return
+
+        id_range = self._buffer.id_range()
+        if id_range is not None and not (id_range[0] <= frame_index <= id_range[1]):
+            self._buffer.clear()
+
     def get_last_buffered(self):
-        return self._buffer.last() if self._buffer else None
+        return self._buffer.last if self._buffer else None
 
     def get_buffer_frame(self, frame_index: int):
         return self._buffer.get(frame_index) if self._buffer else None
 
+    # ---------------------------------------------------------
+    # Prefetch
+    # ---------------------------------------------------------
+
+    def _decode_into_buffer(self):
+        """ Декодирует следующий кадр и кладёт его в буфер с абсолютным индексом. """
+        frame = self._decoder.read()
+        if frame is not None:
+            self._buffer_frame(frame, self._decoder.cur_frame_id() - 1)
+        return frame
+
+    def _read_at_cursor(self):
+        """
+            Возвращает кадр под курсором и сдвигает курсор. Вызывается под _decoder_lock.
+
+            1. Кадр есть в буфере — отдаём копию без декодирования.
+            2. Декодер стоит не дальше окна позади курсора — декодируем вперёд,
+               складывая промежуточные кадры в буфер (так заполняется окно «позади»).
+            3. Иначе — seek к курсору. Если seek не удался, но декодер стоит не дальше
+               курсора (OpenCV остановился на keyframe раньше цели) — декодируем вперёд;
+               проскочил курсор — кадр не возвращаем (None), курсор не сдвигается.
+        """
+        cursor = self._cursor
+
+        cached = self._buffer.peek_by_absolute(cursor) if self._buffer else None
+        if cached is not None:
+            self._cursor = cursor + 1
+            # Копия: слот буфера будет перезаписан фоновым чтением
+            return cached.copy()
+
+        pos = self._decoder.cur_frame_id()
+        if not (pos <= cursor <= pos + self._config.buffer_size):
+            if not self._decoder.seek(cursor) or self._decoder.cur_frame_id() != cursor:
+                # seek не попал в курсор: за курсором кадр под ним уже не получить,
+                # перед курсором (OpenCV остановился на keyframe) — дочитываем вперёд
+                if self._decoder.cur_frame_id() > cursor:
+                    return None
+
+        while True:
+            frame = self._decode_into_buffer()
+            if frame is None:
+                return None
+            if self._decoder.cur_frame_id() > cursor:
+                break
+
+        # Декодер перескочил курсор (пересинхронизация по keyframe) — это другой кадр
+        if self._decoder.cur_frame_id() - 1 != cursor:
+            return None
+
+        self._cursor = self._decoder.cur_frame_id()
+        return frame
+
+    def _prefetch_step(self) -> bool:
+        """
+            Дочитывает один кадр вперёд, если окно впереди курсора ещё не заполнено.
+            Вызывается под _decoder_lock. Возвращает False, когда читать больше не нужно.
+        """
+        pos = self._decoder.cur_frame_id()
+        if not (self._cursor <= pos < self._cursor + self._window_ahead):
+            return False
+        return self._decode_into_buffer() is not None
+
+    def _prefetch_loop(self) -> None:
+        """ Фоновый поток: после каждого пробуждения заполняет окно впереди курсора. """
+        while not self._prefetch_stop.is_set():
+            self._prefetch_wakeup.wait()
+            self._prefetch_wakeup.clear()
+
+            while not self._prefetch_stop.is_set():
+                with self._decoder_lock:
+                    if not self._prefetch_step():
+                        break
+
+    def _start_prefetch(self) -> None:
+        if self._prefetch_thread and self._prefetch_thread.is_alive():
+            if not self._prefetch_stop.is_set():
+                return
+            # Прошлый поток ещё завершает шаг чтения — второй читатель декодера недопустим
+            self._prefetch_thread.join()
+
+        self._cursor = self._decoder.cur_frame_id()
+        self._prefetch_stop.clear()
+        self._prefetch_thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+        self._prefetch_thread.start()
+        self._prefetch_wakeup.set()
+
+    def _stop_prefetch(self) -> None:
+        self._prefetch_stop.set()
+        self._prefetch_wakeup.set()
+
+        if self._prefetch_thread and self._prefetch_thread.is_alive():
+            self._prefetch_thread.join(timeout=1.0)
+
+        # Живой поток не забываем: _start_prefetch дождётся его, а не запустит второй
+        if self._prefetch_thread and not self._prefetch_thread.is_alive():
+            self._prefetch_thread = None
+
     # ---------------------------------------------------------
     # Async
     # ---------------------------------------------------------
 
     def start_async(self) -> None:
         if self._async_reader:
+            self._sync_decoder_to_replay()
             self._async_reader.start()
 
     def stop_async(self) -> None:
         if self._async_reader:
             self._async_reader.stop()
 
-    def get_last_async_frame(self):
-        return self._async_reader.get_last() if self._async_reader else None
+    def is_async_running(self) -> bool:
+        """ True, если async-поток ещё читает кадры (не остановлен и не дошёл до конца видео). """
+        return self._async_reader.is_running() if self._async_reader else False
+
+    def get_last_async_frame(self, blocking: bool = False, timeout: float = 0.1):
+        """ Последний кадр async-потока; blocking=True — дождаться нового кадра (не дольше timeout). """
+        return self._async_reader.get_last(blocking, timeout) if self._async_reader else None
+
+    def get_next_async_frame(self):
+        return self._async_reader.get_next() if self._async_reader else None
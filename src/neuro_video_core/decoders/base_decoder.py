@@ -1,12 +1,29 @@
+import logging
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, Optional
 
-from numpy import ndarray
+from numpy import copyto, ndarray
 
 from ..settings import VideoCoreConfig
 
 
+def warn_once(logger: logging.Logger, msg: str, *args: Any) -> None:
+    """
+        Предупреждение для горячих путей (seek/read): сообщение не форматируется,
+        если уровень WARNING выключен, а одинаковые (logger, msg, args) пишутся один раз.
+        args должны быть хешируемыми (исключения передавать как str(e)).
+    """
+    if logger.isEnabledFor(logging.WARNING):
+        _emit_warning(logger, msg, args)
+
+
+@lru_cache(maxsize=256)
+def _emit_warning(logger: logging.Logger, msg: str, args: tuple) -> None:
+    logger.warning(msg, *args)
+
+
 class BaseDecoder(ABC):
     """
         Базовый интерфейс для всех видео-декодеров.
@@ -17,7 +34,19 @@ class BaseDecoder(ABC):
         * читать кадры последовательно;
         * сообщать текущий индекс кадра.
     """
+    # Декодеры создаются на каждое видео — атрибуты в слотах, без __dict__
+    __slots__ = (
+        "_uri", "_path", "_config", "_current_frame_id",
+        "_fps", "_total_frames", "_grabbed_frame",
+    )
+
+    # Прыжок вперёд не дальше порога выполняется дочитыванием кадров, без seek
+    # (см. _scan_forward): seek — это сброс кодека и проход GOP от keyframe
+    FORWARD_SCAN_THRESHOLD = 30
+
     def __init__(self, path: str, config: VideoCoreConfig):
+        # Исходная строка источника: для URI и индексов камер (Path портит "rtsp://")
+        self._uri: str = str(path)
         self._path: Path = Path(path).expanduser().resolve()
         self._config: VideoCoreConfig = config
 
@@ -28,6 +57,9 @@ class BaseDecoder(ABC):
         self._fps: Optional[float] = None
         self._total_frames: Optional[int] = None
 
+        # Кадр, захваченный grab() и ещё не отданный через retrieve()
+        self._grabbed_frame: Optional[Any] = None
+
     # ---------------------------------------------------------
     # Lifecycle
     # ---------------------------------------------------------
@@ -69,13 +101,28 @@ class BaseDecoder(ABC):
     # ---------------------------------------------------------
 
     @abstractmethod
-    def seek(self, frame_index: int) -> None:
-        """ Прыжок к указанному кадру (индексному). """
+    def seek(self, frame_index: int, *, keyframe_only: bool = False) -> bool:
+        """
+            Прыжок к указанному кадру (индексному).
+            :param keyframe_only: допускается остановка на ближайшем предшествующем keyframe
+                                  (быстрее, без декодирования промежуточных кадров);
+                                  декодеры, не умеющие так, выполняют обычный seek.
+        """
         pass
 
     def cur_frame_id(self) -> int:
         raise NotImplementedError
 
+    def _scan_forward(self, frame_index: int) -> bool:
+        """
+            Продвигает декодер до frame_index через grab() — без seek и без конвертации кадров.
+            При неуспехе (конец видео) позиция уже сдвинута — вызывающий выполняет обычный seek.
+        """
+        while self.cur_frame_id() < frame_index:
+            if not self.grab():
+                return False
+        return self.cur_frame_id() == frame_index
+
     # ---------------------------------------------------------
     # Reading
     # ---------------------------------------------------------
@@ -85,6 +132,67 @@ class BaseDecoder(ABC):
         """ Читает следующий кадр. Возвращает None при достижении конца видео. """
         pass
 
+    def read_batch(self, out: ndarray) -> int:
+        """
+            Читает до len(out) кадров подряд прямо в предвыделенный массив out (N, H, W, C).
+            Реализация по умолчанию копирует результат read(); декодеры, умеющие
+            декодировать сразу в переданный буфер, переопределяют метод.
+            :return: количество прочитанных кадров (меньше len(out) — конец видео).
+        """
+        count = 0
+        for slot in out:
+            frame = self.read()
+            if frame is None:
+                break
+            copyto(slot, frame)
+            count += 1
+        return count
+
+    def sample(self, indices: Iterable[int]) -> list[Optional[ndarray]]:
+        """
+            Выборочное чтение разреженных кадров: seek + read на каждый индекс.
+            Индексы обходятся по возрастанию (декодер движется только вперёд),
+            соседние индексы читаются подряд без seek.
+            :return: кадры в порядке indices (None — кадр прочитать не удалось).
+        """
+        indices = list(indices)
+        frames: dict[int, Optional[ndarray]] = {}
+
+        for frame_index in sorted(set(indices)):
+            target = self.clamp_frame_index(frame_index)
+            if self.cur_frame_id() != target and not self.seek(target):
+                frames[frame_index] = None
+                continue
+            frames[frame_index] = self.read()
+
+        return [frames[frame_index] for frame_index in indices]
+
+    def read_async(self) -> Optional[ndarray]:
+        """
+            Чтение кадра из фонового потока (AsyncFrameReader).
+            По умолчанию совпадает с read(); декодеры, у которых есть
+            бэкенд, отпускающий GIL во время декодирования, переопределяют метод.
+        """
+        return self.read()
+
+    def grab(self) -> bool:
+        """
+            Продвигает декодер на один кадр без выдачи ndarray.
+            Вместе с retrieve() образует двухшаговый интерфейс чтения:
+            grab() — только перейти к кадру, retrieve() — получить изображение.
+
+            Реализация по умолчанию декодирует кадр целиком через read();
+            конкретные декодеры переопределяют её, пропуская преобразование цвета.
+
+            :return: True если кадр захвачен, False при конце видео.
+        """
+        self._grabbed_frame = self.read()
+        return self._grabbed_frame is not None
+
+    def retrieve(self) -> Optional[ndarray]:
+        """ Возвращает изображение кадра, захваченного последним вызовом grab(). """
+        return self._grabbed_frame
+
     # ---------------------------------------------------------
     # Common for all decoders
     # ---------------------------------------------------------
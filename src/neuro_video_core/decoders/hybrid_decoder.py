@@ -1,15 +1,19 @@
 from __future__ import annotations
 
-import warnings
+import logging
+import mmap
+from collections import deque
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
-from .base_decoder import BaseDecoder
+from .base_decoder import BaseDecoder, warn_once
 from .decoder_type import DecoderType
 from .opencv_decoder import OpenCVDecoder
 from .pyav_decoder import PyAVDecoder
 from ..settings import VideoCoreConfig
 
+logger = logging.getLogger(__name__)
+
 
 class HybridDecoder(BaseDecoder):
     """
@@ -20,7 +24,9 @@ class HybridDecoder(BaseDecoder):
         Обеспечить:
         * корректные метаданные (FPS, total_frames, временная шкала) — через PyAV;
         * быстрое чтение кадров — через OpenCV;
-        * максимально точный seek — PyAV управляет временной шкалой.
+        * быстрый seek — по умолчанию через OpenCV (тот же бэкенд, что читает кадры);
+          PyAV выполняет seek первым только при config.precise_timeline
+          или как запасной вариант, если seek OpenCV не удался.
 
         Сильные стороны:
         ----------------
@@ -38,6 +44,15 @@ class HybridDecoder(BaseDecoder):
         * анализ видео, где важны FPS и достаточно «почти точного» seek.
     """
 
+    __slots__ = (
+        "_opencv", "_pyav", "_pyav_opened", "_pyav_reads",
+        "_last_read_by", "_last_seek_by", "_recent_seeks",
+        "_file", "_mm",
+    )
+
+    # Сколько последних целей seek учитывается при распознавании скраббинга
+    SCRUB_HISTORY = 4
+
     def __init__(self, path: str | Path, config: VideoCoreConfig):
         """
             Инициализация гибридного декодера.
@@ -46,11 +61,27 @@ class HybridDecoder(BaseDecoder):
         """
         super().__init__(path, config)
 
-        self._opencv = OpenCVDecoder(self._path, config)
-        self._pyav = PyAVDecoder(self._path, config)
+        # Под-декодерам — исходная строка: Path портит URI ("rtsp://"), и OpenCV
+        # не распознал бы поток/камеру; self._path — только для mmap локального файла
+        self._opencv = OpenCVDecoder(self._uri, config)
+        # PyAV открывается только для метаданных; контейнер и кодек поднимаются
+        # лениво при первом seek/чтении через него
+        self._pyav = PyAVDecoder(self._uri, config, metadata_only=True)
 
         # Декодер, который сделал последний прыжок
         self._last_seek_by: DecoderType | None = None
+        # Последние цели seek (для распознавания скраббинга)
+        self._recent_seeks: deque[int] = deque(maxlen=self.SCRUB_HISTORY)
+
+        # Декодер, который последним выдал кадр (read / read_async)
+        self._last_read_by: DecoderType | None = None
+        self._pyav_opened: bool = False
+        # Кадры не в BGR (config.pix_fmt) отдаёт PyAV: OpenCV умеет только BGR
+        self._pyav_reads: bool = False
+
+        # Общее отображение локального файла в память (см. _map_file)
+        self._file: Optional[BinaryIO] = None
+        self._mm: Optional[mmap.mmap] = None
 
     # ---------------------------------------------------------
     # Lifecycle
@@ -64,12 +95,20 @@ class HybridDecoder(BaseDecoder):
             1. PyAV → источник истины по метаданным.
             2. OpenCV → источник кадров.
             3. Если оба не открылись — возвращаем False.
+
+            Локальный файл читается PyAV из mmap: байты контейнера проходят через
+            page cache один раз, и OpenCV открывает тот же файл уже из прогретого кэша.
         """
+        self._map_file()
+
         ok_pyav = self._pyav.open()
         ok_opencv = self._opencv.open()
+        self._pyav_opened = ok_pyav
+        self._pyav_reads = ok_pyav and self._config.pix_fmt != "bgr24"
 
         if not ok_pyav and not ok_opencv:
-            warnings.warn(f"HybridDecoder: unable to open both decoders: {self._path}")
+            logger.warning("HybridDecoder: unable to open both decoders: %s", self._path)
+            self._release_file()
             return False
 
         # Метаданные берём у PyAV, если он доступен
@@ -88,6 +127,39 @@ class HybridDecoder(BaseDecoder):
             self._opencv.close()
         finally:
             self._pyav.close()
+            self._pyav_opened = False
+            self._pyav_reads = False
+            self._last_read_by = None
+            # mmap освобождается последним — после закрытия контейнера PyAV
+            self._release_file()
+
+    def _map_file(self) -> None:
+        """ Отображает локальный файл в память и передаёт его PyAV вместо пути. """
+        if self._mm is not None or not self._path.is_file():
+            return
+
+        try:
+            self._file = open(self._path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            # Например, пустой файл — PyAV откроет его по пути сам
+            logger.warning("HybridDecoder: mmap failed, falling back to path: %s", e)
+            self._release_file()
+            return
+
+        self._pyav.set_input(self._mm)
+
+    def _release_file(self) -> None:
+        """ Отключает mmap от PyAV и закрывает отображение и файл. """
+        self._pyav.set_input(None)
+
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
     # ---------------------------------------------------------
     # Metadata
@@ -131,54 +203,109 @@ class HybridDecoder(BaseDecoder):
     # Navigation
     # ---------------------------------------------------------
 
-    def _frame_to_seconds(self, frame_index: int) -> float:
-        """ Перевод индекса кадра в секунды. """
-        fps = self.get_fps()
-        if fps <= 0:
-            return 0.0
-        return max(0.0, frame_index / fps)
-
-    def seek(self, frame_index: int) -> bool:
+    def seek(self, frame_index: int, *, keyframe_only: bool = False) -> bool:
         """
             Выполняет безопасный seek.
 
             Правила:
             --------
             * никогда не бросает исключений;
-            * если PyAV может — он главный;
-            * OpenCV используется для синхронизации;
+            * цель не дальше FORWARD_SCAN_THRESHOLD кадров впереди —
+              OpenCV дочитывает до неё grab() без seek;
+            * кадры читает OpenCV, поэтому seek выполняет он;
+            * если кадры читает PyAV (pix_fmt не bgr24) — seek только через PyAV,
+              OpenCV не трогаем;
+            * config.precise_timeline — сначала seek PyAV (источник временной шкалы),
+              OpenCV синхронизируется по нему;
+            * первым пробуется бэкенд, успешно выполнивший прошлый seek;
+            * config.scrub_detection — при переходах туда-обратно seek идёт по keyframe;
             * если оба не смогли — остаёмся на месте.
+            keyframe_only передаётся PyAV (см. PyAVDecoder.seek).
         """
 
-        frame_index = self.clamp_frame_index(frame_index)
+        frame_index = self._clamp_and_track(frame_index)
 
-        pyav_ok = False
-        opencv_ok = False
+        # Скраббинг (переходы туда-обратно) — точность не нужна, хватает keyframe
+        if self._config.scrub_detection and self._is_scrubbing():
+            keyframe_only = True
 
-        # Пытаемся PyAV (точно, надёжно)
-        pyav_ok = self._pyav.seek(frame_index)
-        if pyav_ok:
-            # Синхронизируем OpenCV по возможности
-            self._opencv.seek(frame_index)
+        if self._pyav_reads:
+            # Кадры читает PyAV: seek OpenCV был бы лишним, а короткий
+            # прыжок вперёд PyAVDecoder.seek дочитывает сам
+            if not self._pyav.seek(frame_index, keyframe_only=keyframe_only):
+                warn_once(logger, "HybridDecoder: seek failed at frame %d", frame_index)
+                return False
             self._last_seek_by = DecoderType.PYAV
+            self._last_read_by = DecoderType.PYAV
             return True
 
-        # PyAV не смог → пробуем OpenCV
-        opencv_ok = self._opencv.seek(frame_index)
-        if opencv_ok:
-            self._last_seek_by = DecoderType.OPENCV
+        # Короткий прыжок вперёд: OpenCVDecoder.seek дочитывает кадры grab() без seek
+        delta = frame_index - self._opencv.cur_frame_id()
+        if 0 <= delta <= self.FORWARD_SCAN_THRESHOLD and self._opencv.seek(frame_index):
+            # Позиция — у OpenCV, как после обычного чтения
+            self._last_read_by = DecoderType.OPENCV
             return True
 
+        # Первым пробуем бэкенд, который выполнил прошлый seek (временная локальность):
+        # по умолчанию PyAV при точной временной шкале, иначе OpenCV — источник кадров
+        default = DecoderType.PYAV if self._config.precise_timeline else DecoderType.OPENCV
+        first = self._last_seek_by or default
+        second = DecoderType.OPENCV if first is DecoderType.PYAV else DecoderType.PYAV
+
+        for backend in (first, second):
+            if self._seek_via(backend, frame_index, keyframe_only):
+                return True
+
         # Оба декодера не смогли
-        warnings.warn(f"HybridDecoder: seek failed at frame {frame_index}")
+        warn_once(logger, "HybridDecoder: seek failed at frame %d", frame_index)
         return False
 
+    def _seek_via(self, backend: DecoderType, frame_index: int, keyframe_only: bool) -> bool:
+        """ Seek через указанный бэкенд; при seek через PyAV OpenCV синхронизируется по нему. """
+        if backend is DecoderType.PYAV:
+            if not self._pyav.seek(frame_index, keyframe_only=keyframe_only):
+                return False
+            # Синхронизируем OpenCV по возможности
+            self._opencv.seek(frame_index)
+        elif not self._opencv.seek(frame_index):
+            return False
+
+        self._last_seek_by = backend
+        self._last_read_by = None
+        return True
+
+    def _clamp_and_track(self, frame_index: int) -> int:
+        """ Клампит индекс и запоминает его в истории переходов. """
+        frame_index = self.clamp_frame_index(frame_index)
+        self._recent_seeks.append(frame_index)
+        return frame_index
+
+    def _is_scrubbing(self) -> bool:
+        """ Скраббинг: направление переходов в истории менялось хотя бы дважды. """
+        seeks = self._recent_seeks
+        turns = 0
+        prev_step = 0
+        for i in range(1, len(seeks)):
+            step = seeks[i] - seeks[i - 1]
+            if step == 0:
+                continue
+            if prev_step and (step > 0) != (prev_step > 0):
+                turns += 1
+            prev_step = step
+        return turns >= 2
+
     def cur_frame_id(self) -> int:
         """
             Возвращает текущий кадр в зависимости от того,
-            кто выполнял последний seek.
+            кто последним читал кадры или выполнял seek.
         """
 
+        # После чтения позиция определяется читавшим декодером
+        if self._last_read_by is DecoderType.PYAV:
+            return self._pyav.cur_frame_id()
+        if self._last_read_by is DecoderType.OPENCV:
+            return self._opencv.cur_frame_id()
+
         # Если был seek PyAV → он источник правды
         if self._last_seek_by is DecoderType.PYAV:
             return self._pyav.cur_frame_id()
@@ -205,5 +332,80 @@ class HybridDecoder(BaseDecoder):
             Читает кадр из OpenCVDecoder (быстро).
             PyAV не используется для чтения кадров в MVP:
             он отвечает только за “timeline”.
+            Исключение — config.pix_fmt не bgr24: PyAV отдаёт кадр
+            в нужном формате без промежуточной конвертации в BGR.
         """
+        if self._pyav_reads:
+            return self._read_pyav()
+
+        self._use_opencv_reader()
         return self._opencv.read()
+
+    def read_batch(self, out) -> int:
+        """ Пакетное чтение прямо в out — через OpenCVDecoder (или PyAV, см. read). """
+        if self._pyav_reads:
+            return super().read_batch(out)
+
+        self._use_opencv_reader()
+        return self._opencv.read_batch(out)
+
+    def _use_opencv_reader(self) -> None:
+        """ Делает OpenCV читающим бэкендом, догоняя позицию PyAV после async-чтения. """
+        if self._last_read_by is DecoderType.PYAV:
+            self._opencv.seek(self._pyav.cur_frame_id())
+
+        self._last_read_by = DecoderType.OPENCV
+
+    def sample(self, indices):
+        """
+            Выборочное чтение разреженных кадров — только через PyAV:
+            точный seek одного контейнера без синхронизации OpenCV на каждом индексе.
+            Следующее чтение OpenCV догонит позицию PyAV (см. _use_opencv_reader).
+        """
+        if not self._pyav_opened:
+            return super().sample(indices)
+
+        self._use_pyav_reader()
+        return self._pyav.sample(indices)
+
+    def read_async(self):
+        """
+            Чтение для AsyncFrameReader — через PyAV.
+
+            cv2.VideoCapture.read держит GIL на всё время декодирования,
+            и поток-потребитель простаивает. PyAV (многопоточный кодек)
+            отпускает GIL между кадрами, поэтому фоновое чтение идёт через него.
+            Если PyAV не открылся — используем OpenCV.
+        """
+        if not self._pyav_opened:
+            return self.read()
+        return self._read_pyav()
+
+    def _read_pyav(self):
+        """ Читает кадр через PyAV, продолжая с позиции, до которой дочитал OpenCV. """
+        self._use_pyav_reader()
+        return self._pyav.read()
+
+    def _use_pyav_reader(self) -> None:
+        """ Делает PyAV читающим бэкендом, догоняя позицию OpenCV. """
+        if self._last_read_by is not DecoderType.PYAV:
+            pos = self._opencv.cur_frame_id()
+            if pos != self._pyav.cur_frame_id():
+                self._pyav.seek(pos)
+
+        self._last_read_by = DecoderType.PYAV
+
+    def grab(self) -> bool:
+        """ Захват кадра без декодирования в BGR — через OpenCVDecoder (или PyAV, см. read). """
+        if self._pyav_reads:
+            self._use_pyav_reader()
+            return self._pyav.grab()
+
+        self._use_opencv_reader()
+        return self._opencv.grab()
+
+    def retrieve(self):
+        """ Декодирует кадр, захваченный grab(), — тем же бэкендом. """
+        if self._pyav_reads:
+            return self._pyav.retrieve()
+        return self._opencv.retrieve()
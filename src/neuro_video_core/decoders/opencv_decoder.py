@@ -1,12 +1,18 @@
+import logging
+import os
+import sys
 from pathlib import Path
 from typing import Optional
 
 import cv2
+import numpy as np
 from numpy import ndarray
 
-from .base_decoder import BaseDecoder
+from .base_decoder import BaseDecoder, warn_once
 from ..settings import VideoCoreConfig
-import warnings
+from ..sources.source_type import SourceType
+
+logger = logging.getLogger(__name__)
 
 
 class OpenCVDecoder(BaseDecoder):
@@ -34,11 +40,28 @@ class OpenCVDecoder(BaseDecoder):
         при наличии точного позиционирования через PyAV.
     """
 
+    __slots__ = ("_cap", "_cvt_code")
+
+    # cv2.VideoCapture всегда выдаёт BGR; остальные config.pix_fmt получаем через cvtColor.
+    # "raw" для OpenCV — его собственный кадр, т.е. тот же BGR
+    _CVT_CODES = {
+        "rgb24": cv2.COLOR_BGR2RGB,
+        "gray": cv2.COLOR_BGR2GRAY,
+        "yuv420p": cv2.COLOR_BGR2YUV_I420,
+    }
+
     def __init__(self, path: str | Path, config: VideoCoreConfig):
         """ Инициализация декодера. """
         super().__init__(path, config)
         self._cap: Optional[cv2.VideoCapture] = None
 
+        # Код cv2.cvtColor для config.pix_fmt (None — кадр остаётся BGR)
+        self._cvt_code: Optional[int] = None
+        if config.pix_fmt not in ("bgr24", "raw"):
+            self._cvt_code = self._CVT_CODES.get(config.pix_fmt)
+            if self._cvt_code is None:
+                logger.warning("OpenCV: unsupported pix_fmt '%s', frames stay bgr24", config.pix_fmt)
+
     # ---------------------------------------------------------
     # Lifecycle
     # ---------------------------------------------------------
@@ -52,11 +75,12 @@ class OpenCVDecoder(BaseDecoder):
             Логика:
             -------
             FPS и total_frames могут быть неточными для некоторых контейнеров.
+            Значения снимаются один раз — get_fps()/get_total_frames() их только возвращают.
         """
-        fps = self.get_fps()
-        self._fps = fps if fps > 0 else None
+        fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self._fps = float(fps) if fps and fps > 0 else None
 
-        total = self.get_total_frames()
+        total = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self._total_frames = total if total > 0 else None
 
     def open(self) -> bool:
@@ -65,23 +89,52 @@ class OpenCVDecoder(BaseDecoder):
 
             Алгоритм:
             ---------
-            1. Пытаемся открыть cv2.VideoCapture.
+            1. Пытаемся открыть cv2.VideoCapture
+               (для камер и сетевых потоков — см. _open_stream).
             2. Если не удалось — возвращаем False.
             3. Инициализируем метаданные fps и total_frames.
             4. Возвращаем True.
 
             :return: True если источник открыт, иначе False.
         """
-        self._cap = cv2.VideoCapture(str(self._path))
+        source_type = SourceType.detect(self._uri)
+        if source_type is SourceType.FILE:
+            self._cap = cv2.VideoCapture(str(self._path))
+        else:
+            self._cap = self._open_stream(source_type)
 
         if not self._cap.isOpened():
-            warnings.warn(f"OpenCV: cannot open video: {self._path}")
+            logger.warning("OpenCV: cannot open video: %s", self._uri)
             self._cap = None
             return False
 
         self._init_metadata()
         return True
 
+    def _open_stream(self, source_type: SourceType) -> cv2.VideoCapture:
+        """
+            Открывает камеру или сетевой поток с явным бэкендом:
+            * камера — V4L2 на Linux (индекс или /dev/video*);
+            * RTSP/HTTP — FFmpeg; для RTSP по умолчанию транспорт TCP
+              (переменную OPENCV_FFMPEG_CAPTURE_OPTIONS, заданную пользователем, не трогаем).
+            Внутренняя очередь кадров сокращается до 1: отдаётся самый свежий кадр,
+            а не накопленные секунды задержки.
+        """
+        uri = self._uri.strip()
+        if source_type is SourceType.CAMERA:
+            target = int(uri) if uri.isdigit() else uri
+            backend = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+        else:
+            target = uri
+            backend = cv2.CAP_FFMPEG
+            if source_type is SourceType.RTSP:
+                os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "rtsp_transport;tcp|buffer_size;65536")
+
+        cap = cv2.VideoCapture(target, backend)
+        if cap.isOpened():
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
     def close(self) -> None:
         """ Закрывает видеопоток и освобождает ресурсы. """
         if self._cap:
@@ -96,31 +149,27 @@ class OpenCVDecoder(BaseDecoder):
 
     def get_fps(self) -> float:
         """
-            Возвращает FPS видео. Может быть неточным.
+            Возвращает FPS видео, снятый при open(). Может быть неточным.
             :return: fps или 0.0, если определить невозможно.
         """
         if not self._cap:
             return 0.0
-
-        fps = self._cap.get(cv2.CAP_PROP_FPS)
-        return float(fps) if fps and fps > 0 else 0.0
+        return self._fps or 0.0
 
     def get_total_frames(self) -> int:
         """
-            Возвращает количество кадров (может быть неточным).
+            Возвращает количество кадров, снятое при open() (может быть неточным).
             :return: число кадров или 0, если определить невозможно.
         """
         if not self._cap:
             return 0
-
-        total = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        return total if total > 0 else 0
+        return self._total_frames or 0
 
     # ---------------------------------------------------------
     # Navigation
     # ---------------------------------------------------------
 
-    def seek(self, frame_index: int) -> bool:
+    def seek(self, frame_index: int, *, keyframe_only: bool = False) -> bool:
         """
             Перемещает положение чтения на указанный кадр.
             Метод безопасный:
@@ -131,56 +180,67 @@ class OpenCVDecoder(BaseDecoder):
             ------------------------
             * перемещение производится по ключевым кадрам,
             * возможны смещения на ±2–10 кадров.
+            config.force_opencv_seek — если set() остановился раньше цели,
+            декодер дочитывает оставшиеся кадры grab() (см. _seek_decode).
+            Цель не дальше FORWARD_SCAN_THRESHOLD кадров впереди — дочитывается
+            grab() без set().
+            keyframe_only не поддерживается и игнорируется.
         """
 
         if not self._cap:
-            warnings.warn("OpenCV: seek failed — decoder not opened.")
+            warn_once(logger, "OpenCV: seek failed — decoder not opened.")
             return False
 
         # Клампим индекс
         frame_index = self.clamp_frame_index(frame_index)
 
-        # Пытаемся перейти
+        # Короткий прыжок вперёд: set() — это seek кодека и проход GOP, grab() дешевле
+        delta = frame_index - self._current_frame_id
+        if 0 <= delta <= self.FORWARD_SCAN_THRESHOLD and self._scan_forward(frame_index):
+            return True
+
+        # Пытаемся перейти; фактическую позицию сверяем один раз — здесь, а не при чтении
         try:
+            if self._config.force_opencv_seek:
+                return self._seek_decode(frame_index)
+
             self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
             pos = int(self._cap.get(cv2.CAP_PROP_POS_FRAMES))
+            self._current_frame_id = pos if pos >= 0 else frame_index
             return pos == frame_index
         except Exception as e:
-            warnings.warn(f"OpenCV: seek failed — {e}")
+            warn_once(logger, "OpenCV: seek failed — %s", str(e))
             return False
 
-    def cur_frame_id(self) -> int:
+    def _seek_decode(self, target: int) -> bool:
         """
-            Возвращает текущий индекс кадра.
-
-            Логика:
-            -------
-            1. Пытаемся получить позицию через OpenCV.
-            2. Если значение валидно — синхронизируем с _current_frame_id.
-            3. Если OpenCV вернул некорректное значение (0 или <0),
-               то возвращаем _current_frame_id, сохранив предыдущее состояние.
-
-            Примечание:
-            -----------
-            OpenCV иногда может вернуть 0 даже в середине видео —
-            поэтому _current_frame_id служит стабилизатором.
+            Seek + дочитывание до цели: после set() кадры между фактической
+            позицией (обычно keyframe) и target пропускаются через grab() —
+            без конвертации YUV → BGR, которую выполняют retrieve()/read().
         """
-        if not self._cap:
-            return self._current_frame_id
-
-        try:
-            pos = int(self._cap.get(cv2.CAP_PROP_POS_FRAMES))
-        except Exception:
-            # В случае сбоя возвращаем последний валидный кадр
-            return self._current_frame_id
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        pos = int(self._cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if pos < 0 or pos > target:
+            # Позиция неизвестна или проскочили цель — дочитать нельзя
+            self._current_frame_id = pos if pos >= 0 else target
+            return pos == target
 
-        # Коррекция некорректных значений
-        if pos < 0:
-            pos = 0
+        while pos < target and self._cap.grab():
+            pos += 1
 
-        # Обновляем счётчик в BaseDecoder
         self._current_frame_id = pos
-        return pos
+        return pos == target
+
+    def cur_frame_id(self) -> int:
+        """
+            Возвращает текущий индекс кадра.
+
+            Источник — собственный счётчик _current_frame_id:
+            увеличивается при каждом read()/grab() и сверяется с OpenCV в seek().
+            OpenCV иногда возвращает 0 в середине видео, поэтому
+            CAP_PROP_POS_FRAMES здесь не опрашивается.
+        """
+        return self._current_frame_id
 
     # ---------------------------------------------------------
     # Reading
@@ -194,22 +254,18 @@ class OpenCVDecoder(BaseDecoder):
             -------
             1. Пытаемся прочитать кадр.
             2. Если не удалось — возвращаем None.
-            3. После успешного чтения пытаемся получить позицию из OpenCV.
-            4. Если позиция валидна — синхронизируем _current_frame_id.
-            5. Если позиция неверна (0 или отрицательная), то:
-                * считаем, что кадр инкрементирован,
-                * увеличиваем _current_frame_id вручную.
-            6. Возвращаем кадр.
-
-            Причины такой логики:
-            ----------------------
+            3. Увеличиваем _current_frame_id и возвращаем кадр.
+
+            Почему без CAP_PROP_POS_FRAMES:
+            -------------------------------
             POS_FRAMES в OpenCV иногда отдаёт некорректные значения, особенно при:
             * RTSP,
             * USB-камерах,
             * H.264 контейнерах,
             * после seek().
-            Поэтому _current_frame_id — стабильный счётчик,
-            который используется во всей VideoCore-системе.
+            К тому же это лишний вызов в C++ на каждый кадр. Поэтому _current_frame_id —
+            собственный счётчик, который сверяется с OpenCV только в seek().
+            Точные индексы по временной шкале даёт PyAV (см. HybridDecoder).
         """
         if not self._cap:
             return None
@@ -218,20 +274,62 @@ class OpenCVDecoder(BaseDecoder):
         if not success:
             return None
 
-        # --- Попытка получить позицию ---
-        pos = None
-        try:
-            pos = int(self._cap.get(cv2.CAP_PROP_POS_FRAMES))
-        except Exception:
-            pos = None
+        self._current_frame_id += 1
+        return self._convert(frame)
 
-        # --- Проверяем корректность позиции ---
-        if pos is not None and pos >= 0:
-            # синхронизация с OpenCV-счётчиком
-            self._current_frame_id = pos
-        else:
-            # fallback: OpenCV не дал позицию, но кадр был прочитан
-            self._current_frame_id += 1
+    def read_batch(self, out: ndarray) -> int:
+        """
+            Читает кадры подряд прямо в слоты out: grab() + retrieve(out[i]).
+            OpenCV пишет изображение в переданный массив без новой аллокации,
+            а сами grab/retrieve выполняются в C++ с отпущенным GIL.
+        """
+        if not self._cap:
+            return 0
+
+        # Слоты out имеют форму кадра после cvtColor — читаем покадрово
+        if self._cvt_code is not None:
+            return super().read_batch(out)
+
+        cap = self._cap
+        count = 0
+        for slot in out:
+            if not cap.grab():
+                break
+            success, frame = cap.retrieve(slot)
+            if not success:
+                break
+            # OpenCV мог выделить новый массив (например, если слот не C-contiguous)
+            if frame.ctypes.data != slot.ctypes.data:
+                np.copyto(slot, frame)
+            count += 1
+
+        self._current_frame_id += count
+        return count
+
+    def grab(self) -> bool:
+        """
+            Захватывает следующий кадр без декодирования в BGR (cv2.VideoCapture.grab).
+            Преобразование YUV → BGR выполняется только при вызове retrieve().
+        """
+        if not self._cap:
+            return False
+
+        if not self._cap.grab():
+            return False
+
+        self._current_frame_id += 1
+        return True
+
+    def retrieve(self) -> Optional[ndarray]:
+        """ Декодирует кадр, захваченный последним grab() (cv2.VideoCapture.retrieve). """
+        if not self._cap:
+            return None
 
-        return frame
+        success, frame = self._cap.retrieve()
+        return self._convert(frame) if success else None
 
+    def _convert(self, frame: ndarray) -> ndarray:
+        """ Переводит BGR-кадр в config.pix_fmt (без изменений для bgr24). """
+        if self._cvt_code is None:
+            return frame
+        return cv2.cvtColor(frame, self._cvt_code)
@@ -1,14 +1,53 @@
-import warnings
+import logging
+import os
+import queue
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import av
+import numpy as np
+from av.video.reformatter import VideoReformatter
 from numpy import ndarray
 
-from .base_decoder import BaseDecoder
+from .base_decoder import BaseDecoder, warn_once
 from ..settings import VideoCoreConfig
+from ..sources.source_type import SourceType
 from ..exceptions import VideoOpenError
 
+logger = logging.getLogger(__name__)
+
+
+# Упакованные (одноплоскостные) форматы, которые retrieve() копирует в общий выходной буфер:
+# формат → число каналов
+_PACKED_CHANNELS = {"bgr24": 3, "rgb24": 3, "gray": 1}
+
+
+@lru_cache(maxsize=None)
+def _has_luma_plane(format_name: str) -> bool:
+    """
+        Плоскость 0 формата — только 8-битная яркость (yuv420p, yuvj420p, nv12, gray и т.п.).
+        Упакованные форматы (yuyv422, uyvy422, ya8) не подходят: в плоскости 0
+        байты Y чередуются с другими компонентами.
+    """
+    luma, *others = av.VideoFormat(format_name).components
+    return (
+        luma.is_luma and luma.plane == 0 and luma.bits == 8
+        and all(component.plane != 0 for component in others)
+    )
+
+
+def _luma_view(frame: av.VideoFrame) -> ndarray:
+    """
+        Плоскость Y кадра как ndarray (H, W) без копирования и без sws_scale.
+        Строки могут быть выровнены (line_size > width) — массив тогда не C-contiguous.
+        Массив ссылается на буфер кадра и держит его живым.
+    """
+    plane = frame.planes[0]
+    rows = np.frombuffer(plane, dtype=np.uint8).reshape(frame.height, plane.line_size)
+    return rows[:, :frame.width]
+
 
 class PyAVDecoder(BaseDecoder):
     """
@@ -37,9 +76,11 @@ class PyAVDecoder(BaseDecoder):
         Использование:
         --------------
         Идеален для оффлайн-задач, анализа и точной навигации.
-        В HybridDecoder применяется как «источник правды»:
-        * PyAV делает seek;
-        * OpenCV возвращает кадр.
+        В HybridDecoder применяется как «источник правды» для метаданных:
+        * fps / total_frames берутся из PyAV;
+        * seek по умолчанию выполняет OpenCV, PyAV — первым только при
+          config.precise_timeline (иначе как запасной вариант);
+        * кадры возвращает OpenCV (PyAV — для pix_fmt, отличных от bgr24).
 
         Ограничения:
         -------------
@@ -47,18 +88,85 @@ class PyAVDecoder(BaseDecoder):
         * Не делает точный seek на каждый кадр — FFmpeg всегда ищет ближайший keyframe.
     """
 
-    def __init__(self, path: str | Path, config: VideoCoreConfig):
+    __slots__ = (
+        "_metadata_only", "_raw_output", "_reformatter", "_decode_ahead",
+        "_reuse_output", "_out_buf", "_opened",
+        "_container", "_stream", "_frame_iter", "_input",
+        "_seek_target_pts", "_resync_frame_id", "_skip_after_keyframe",
+        "_pts_per_frame", "_pts_origin", "_pts_by_idx", "_keyframe_idx",
+        "_ahead_queue", "_ahead_thread", "_ahead_stop", "_ahead_frame", "_consumer_frame_id",
+    )
+
+    # Сколько не-ключевых кадров максимум отбрасывается после seek по keyframe
+    # (ведущие кадры открытого GOP, см. grab)
+    MAX_LEADING_FRAMES = 16
+    # Сколько раз точный seek без таблицы кадров отступает назад, если попал за цель
+    MAX_SEEK_RETRIES = 3
+    # Сколько секунд ждать выхода потока decode-ahead (см. _stop_decode_ahead)
+    AHEAD_JOIN_TIMEOUT = 1.0
+
+    def __init__(self, path: str | Path, config: VideoCoreConfig, metadata_only: bool = False):
         """
             Инициализация декодера.
             :param path: путь к видеофайлу
             :param config: объект конфигурации VideoCore
+            :param metadata_only: open() только считывает метаданные и закрывает контейнер;
+                                  контейнер и кодек открываются заново при первом seek/чтении
         """
         super().__init__(path, config)
 
+        self._metadata_only = metadata_only
+        # pix_fmt="raw" — retrieve()/read() отдают av.VideoFrame без конвертации
+        self._raw_output: bool = config.pix_fmt == "raw"
+
+        # Один VideoReformatter на декодер: контекст sws_scale не пересоздаётся на каждый кадр
+        self._reformatter = VideoReformatter()
+        # config.decode_ahead: глубина очереди кадров, декодируемых фоновым потоком заранее
+        # (в режиме metadata_only кадры читает другой декодер — поток не нужен)
+        self._decode_ahead: int = 0 if metadata_only else max(0, config.decode_ahead)
+        # config.reuse_output: все кадры пишутся в один предвыделенный массив
+        # (несовместимо с decode_ahead — кадры в очереди живут одновременно —
+        # и с prefetch VideoCore: его поток перезаписал бы кадр, уже отданный get_frame())
+        self._reuse_output: bool = (
+            config.reuse_output and config.pix_fmt in _PACKED_CHANNELS
+            and not self._decode_ahead and not config.prefetch_enabled
+        )
+        self._out_buf: Optional[ndarray] = None
+        # open() выполнен успешно (контейнер при этом может быть закрыт — см. metadata_only)
+        self._opened: bool = False
+
         self._container: Optional[av.container.InputContainer] = None
         self._stream: Optional[av.video.stream.VideoStream] = None
         self._frame_iter = None
 
+        # Файлоподобный источник вместо пути (например, mmap) — см. set_input()
+        self._input: Optional[Any] = None
+
+        # Точный seek: кадры с pts < _seek_target_pts отбрасываются при чтении
+        self._seek_target_pts: Optional[int] = None
+        # Seek по keyframe: индекс кадра уточняется по pts первого прочитанного кадра
+        self._resync_frame_id: bool = False
+        # Seek по таблице кадров: сколько кадров отбросить после keyframe до целевого
+        self._skip_after_keyframe: Optional[int] = None
+
+        # Перевод кадр ↔ PTS (в единицах time_base потока) — кэшируется в _init_metadata
+        self._pts_per_frame: Optional[float] = None
+        # PTS кадра 0 (None — ещё не определён; см. _probe_pts_origin)
+        self._pts_origin: Optional[int] = None
+        # Таблица кадров (config.seek_index): PTS кадра по индексу в порядке показа
+        # и индексы keyframe — см. _build_seek_index
+        self._pts_by_idx: Optional[np.ndarray] = None
+        self._keyframe_idx: Optional[np.ndarray] = None
+
+        # Decode-ahead: очередь (индекс следующего кадра, кадр); None — конец видео.
+        # Очередь не None — режим включён; _current_frame_id при этом ведёт поток,
+        # а позиция потребителя — _consumer_frame_id
+        self._ahead_queue: Optional[queue.Queue] = None
+        self._ahead_thread: Optional[threading.Thread] = None
+        self._ahead_stop = threading.Event()
+        self._ahead_frame: Optional[Any] = None
+        self._consumer_frame_id: int = 0
+
     # ---------------------------------------------------------
     # Lifecycle
     # ---------------------------------------------------------
@@ -80,6 +188,21 @@ class PyAVDecoder(BaseDecoder):
         except Exception:
             self._total_frames = None
 
+        # PTS на кадр: 1 / (fps * time_base)
+        time_base = self._stream.time_base
+        if self._fps and time_base:
+            self._pts_per_frame = 1.0 / (self._fps * float(time_base))
+        else:
+            self._pts_per_frame = None
+
+    def set_input(self, source: Optional[Any]) -> None:
+        """
+            Задаёт файлоподобный объект (read/seek), из которого PyAV читает контейнер
+            вместо открытия файла по пути. None — вернуться к чтению по пути.
+            Объект должен жить, пока открыт контейнер; закрывает его владелец.
+        """
+        self._input = source
+
     def open(self) -> bool:
         """
             Открывает контейнер PyAV и инициализирует видеопоток.
@@ -88,39 +211,151 @@ class PyAVDecoder(BaseDecoder):
             2. Найти видеопоток.
             3. Инициализировать метаданные (fps, total_frames).
             4. Создать итератор кадров.
+               При metadata_only вместо этого контейнер закрывается до первого seek/чтения.
 
             Возвращает:
             True  — если контейнер успешно открыт.
             False — если возникла ошибка.
         """
+        if not self._open_container():
+            return False
+
+        # Инициализация fps и total_frames
+        self._init_metadata()
+
+        if self._config.seek_index:
+            if self._pts_by_idx is None:
+                self._build_seek_index()
+            else:
+                # Таблица с прошлого open() переживает close(): число кадров — по ней,
+                # а не по заголовку контейнера (у MKV его может не быть)
+                self._total_frames = len(self._pts_by_idx)
+
+        if self._metadata_only:
+            # Контекст кодека и его буферы не держим, пока кадры не нужны
+            self._release_container()
+        else:
+            # Создаем итератор кадров
+            self._reset_frame_iterator()
+
+        self._opened = True
+
+        if self._decode_ahead:
+            self._start_decode_ahead()
+        return True
+
+    def _open_container(self) -> bool:
+        """ Открывает контейнер и настраивает первый видеопоток. """
         try:
-            self._container = av.open(str(self._path))
+            if self._input is not None:
+                self._input.seek(0)
+                self._container = av.open(self._input)
+            else:
+                # Локальный файл — по нормализованному пути, URI / камера — как есть
+                source = self._uri if SourceType.detect(self._uri) is not SourceType.FILE else str(self._path)
+                self._container = av.open(source)
         except Exception as e:
-            warnings.warn(f"PyAV: failed to open container: {e}")
+            logger.warning("PyAV: failed to open container: %s", e)
             return False
 
         # Получаем первый видеопоток
         try:
             self._stream = self._container.streams.video[0]
         except Exception as e:
-            warnings.warn(f"PyAV: no video stream available: {e}")
+            logger.warning("PyAV: no video stream available: %s", e)
             return False
 
-        # Инициализация fps и total_frames
-        self._init_metadata()
+        # Многопоточный кодек: FFmpeg сам выбирает frame- и/или slice-threading
+        # и отпускает GIL, не блокируя остальные Python-потоки
+        self._stream.thread_type = "AUTO"
+        self._stream.codec_context.thread_count = self._config.decode_threads or (os.cpu_count() or 1)
+        return True
 
-        # Создаем итератор кадров
-        self._reset_frame_iterator()
+    def _build_seek_index(self) -> None:
+        """
+            Строит таблицу кадров демультиплексированием пакетов (без декодирования):
+            PTS каждого кадра в порядке показа и индексы keyframe.
+            С таблицей перевод кадр ↔ PTS точен и для VFR / B-кадров,
+            а total_frames — фактическое число кадров.
+            После построения контейнер перематывается в начало.
+        """
+        pts_list: list[int] = []
+        key_pts: list[int] = []
+        try:
+            for packet in self._container.demux(self._stream):
+                if packet.pts is None:
+                    # flush-пакет в конце потока
+                    continue
+                pts_list.append(packet.pts)
+                if packet.is_keyframe:
+                    key_pts.append(packet.pts)
+
+            self._container.seek(0, any_frame=False, backward=True, stream=self._stream)
+        except Exception as e:
+            logger.warning("PyAV: failed to build seek index: %s", e)
+            self._release_container()
+            self._open_container()
+            return
 
-        return True
+        if not pts_list:
+            return
 
-    def close(self) -> None:
-        """ Закрывает контейнер и сбрасывает состояние. """
+        # Пакеты идут в порядке декодирования — порядок показа задаёт сортировка по PTS
+        self._pts_by_idx = np.sort(np.asarray(pts_list, dtype=np.int64))
+        self._keyframe_idx = np.searchsorted(self._pts_by_idx, np.sort(np.asarray(key_pts, dtype=np.int64)))
+        self._total_frames = len(pts_list)
+
+    def _probe_pts_origin(self) -> None:
+        """
+            Определяет PTS кадра 0 — начало отсчёта для _frame_to_pts/_pts_to_frame.
+            Первый кадр не всегда имеет pts 0 (H.264 в AVI начинается с 1 при start_time 0),
+            поэтому берётся pts первого декодированного кадра.
+            Вызывается лениво — при первом seek без таблицы кадров (open() ничего не декодирует);
+            позицию чтения не сохраняет: вызывающий seek её задаёт заново.
+            При ошибке — stream.start_time (или 0).
+        """
+        self._pts_origin = self._stream.start_time or 0
+        try:
+            self._container.seek(0, any_frame=False, backward=True, stream=self._stream)
+            frame = next(self._container.decode(self._stream), None)
+        except Exception as e:
+            logger.warning("PyAV: failed to probe first frame pts: %s", e)
+            self._release_container()
+            self._open_container()
+            return
+
+        if frame is not None and frame.pts is not None:
+            self._pts_origin = frame.pts
+
+    def _release_container(self) -> None:
+        """ Закрывает контейнер, сохраняя метаданные. """
         if self._container:
             self._container.close()
         self._container = None
         self._stream = None
         self._frame_iter = None
+
+    def _ensure_container(self) -> bool:
+        """ Переоткрывает контейнер, закрытый после open() в режиме metadata_only. """
+        if self._container is not None:
+            return True
+        if not self._opened or not self._open_container():
+            return False
+
+        self._reset_frame_iterator()
+        return True
+
+    def close(self) -> None:
+        """ Закрывает контейнер и сбрасывает состояние. """
+        self._stop_decode_ahead()
+        self._ahead_queue = None
+        self._release_container()
+        self._opened = False
+        self._grabbed_frame = None
+        self._seek_target_pts = None
+        self._resync_frame_id = False
+        self._skip_after_keyframe = None
+        self._pts_origin = None
         self._current_frame_id = 0
 
     # ---------------------------------------------------------
@@ -128,30 +363,46 @@ class PyAVDecoder(BaseDecoder):
     # ---------------------------------------------------------
 
     def get_total_frames(self) -> int:
-        """ Возвращает количество кадров, если контейнер предоставляет эту информацию. """
-        if not self._stream:
-            return 0
-
-        # Может быть 0 или None — тогда считаем неизвестным.
-        frames = self._stream.frames
-        return int(frames) if frames and frames > 0 else 0
+        """
+            Возвращает количество кадров, снятое при open(): из контейнера
+            или по таблице кадров (config.seek_index). 0 — неизвестно.
+        """
+        return self._total_frames or 0 if self._opened else 0
 
     def get_fps(self) -> float:
-        """ Возвращает честный FPS. """
-        if not self._stream:
-            return 0.0
-
-        rate = self._stream.average_rate
-        return float(rate) if rate else 0.0
+        """ Возвращает честный FPS, снятый при open(). """
+        return self._fps or 0.0 if self._opened else 0.0
 
     # ---------------------------------------------------------
     # Navigation
     # ---------------------------------------------------------
 
     def _reset_frame_iterator(self) -> None:
-        """ Создаёт новый итератор кадров. """
+        """ Создаёт новый итератор кадров (контекст кодека остаётся тем же). """
         if self._container and self._stream:
-            self._frame_iter = self._container.decode(self._stream)
+            self._frame_iter = self._decode_frames()
+
+    def _decode_frames(self):
+        """
+            Демультиплексирует пакеты и декодирует их кодеком потока напрямую
+            (то же, что container.decode, но с доступом к пакету до декодирования).
+
+            Пока после точного seek идут пакеты раньше цели, кодек пропускает
+            неопорные кадры (skip_frame = NONREF): они всё равно отбрасываются в grab(),
+            а опорные декодируются — на них ссылаются следующие кадры.
+        """
+        codec = self._stream.codec_context
+        decode = codec.decode
+        # Кодек общий для всех итераторов — режим мог остаться от прошлого
+        skipping = codec.skip_frame != "DEFAULT"
+
+        for packet in self._container.demux(self._stream):
+            target_pts = self._seek_target_pts
+            skip = target_pts is not None and packet.pts is not None and packet.pts < target_pts
+            if skip != skipping:
+                codec.skip_frame = "NONREF" if skip else "DEFAULT"
+                skipping = skip
+            yield from decode(packet)
 
     def _frame_to_pts(self, frame_index: int) -> Optional[int]:
         """
@@ -159,22 +410,62 @@ class PyAVDecoder(BaseDecoder):
 
             Алгоритм:
             ---------
-            seconds = frame_index / fps
-            pts = seconds / time_base
+            pts = _pts_origin + frame_index / fps / time_base = _pts_origin + frame_index * _pts_per_frame
+            PTS в единицах time_base потока — именно их ожидает container.seek(..., stream=...).
+            _pts_origin — pts первого кадра (см. _probe_pts_origin).
+
+            С таблицей кадров (config.seek_index) — точный PTS кадра из неё.
 
             Возвращает pts или None, если вычислить невозможно.
         """
-        if not self._fps or self._fps <= 0:
-            return None
+        table = self._pts_by_idx
+        if table is not None:
+            return int(table[min(max(frame_index, 0), len(table) - 1)])
 
-        try:
-            seconds = frame_index / self._fps
-            pts = int(seconds / float(self._stream.time_base))
-            return pts
-        except Exception:
+        if not self._pts_per_frame:
             return None
 
-    def seek(self, frame_index: int) -> bool:
+        # Округление вниз: кадр с pts >= цели при точном seek не отбрасывается
+        return (self._pts_origin or 0) + int(frame_index * self._pts_per_frame)
+
+    def _pts_to_frame(self, pts: int) -> int:
+        """ Переводит PTS кадра в индекс кадра (обратное к _frame_to_pts). """
+        table = self._pts_by_idx
+        if table is not None:
+            return int(np.searchsorted(table, pts))
+
+        return max(0, int(round((pts - (self._pts_origin or 0)) / self._pts_per_frame)))
+
+    def _has_seek_index(self) -> bool:
+        """
+            Есть ли у потока индекс для seek.
+            Например, у MKV без Cues индекса нет — seek по keyframe там ненадёжен.
+        """
+        entries = getattr(self._stream, "index_entries", None)
+        return entries is None or len(entries) > 0
+
+    def seek(self, frame_index: int, *, keyframe_only: bool = False) -> bool:
+        """
+            Выполняет безопасный seek для PyAV (см. _seek).
+            При decode-ahead поток останавливается, очередь сбрасывается,
+            и декодирование вперёд продолжается уже от новой позиции.
+        """
+        if self._ahead_queue is None:
+            return self._seek(frame_index, keyframe_only=keyframe_only)
+
+        consumer_frame_id = self._consumer_frame_id
+        self._stop_decode_ahead()
+        if not self._opened:
+            # Поток не вышел — декодер отцеплен от контейнера (см. _stop_decode_ahead)
+            return False
+        ok = self._seek(frame_index, keyframe_only=keyframe_only)
+        if not ok:
+            # Поток успел уйти вперёд — возвращаемся к позиции потребителя
+            self._seek(consumer_frame_id)
+        self._start_decode_ahead()
+        return ok
+
+    def _seek(self, frame_index: int, *, keyframe_only: bool = False) -> bool:
         """
             Выполняет безопасный seek для PyAV.
             Метод:
@@ -186,41 +477,125 @@ class PyAVDecoder(BaseDecoder):
             ---------
             1. Клампим индекс.
             2. Проверяем контейнер и поток.
+               Короткий прыжок вперёд — дочитываем кадры без seek (см. _scan_forward).
             3. Получаем PTS.
-            4. Пытаемся выполнить seek.
+            4. Пытаемся выполнить seek к ближайшему предшествующему keyframe.
             5. При успехе — обновляем current_frame_id.
+            Точность:
+            ---------
+            * keyframe_only=False — следующий read() декодирует и отбрасывает кадры
+              от keyframe до целевого, возвращая ровно frame_index;
+            * keyframe_only=True — read() вернёт сам keyframe (быстро, для скраббинга);
+              если у потока нет индекса, выполняется точный seek;
+            * с таблицей кадров (config.seek_index) индексы и keyframe берутся из неё,
+              а до целевого кадра отсчитываются кадры, а не pts — точно и там, где pts
+              декодированных кадров не монотонны (H.264 с B-кадрами в AVI);
+              без таблицы такие файлы позиционируются по pts неточно.
         """
 
         # Клампинг
         frame_index = self.clamp_frame_index(frame_index)
 
         # Проверка контейнера
-        if not self._container or not self._stream:
-            warnings.warn("PyAV: seek failed — container or stream is not initialized.")
+        if not self._ensure_container() or not self._stream:
+            warn_once(logger, "PyAV: seek failed — container or stream is not initialized.")
             return False
 
+        # Короткий прыжок вперёд: seek + flush + проход GOP дороже, чем декодировать кадры подряд
+        if self._is_short_forward(frame_index) and self._scan_forward(frame_index):
+            return True
+
+        # С таблицей кадров ближайший keyframe известен заранее (бинарный поиск):
+        # FFmpeg получает его PTS и не ищет keyframe по индексу контейнера сам
+        seek_pts = None
+        keyframe = None
+        keyframes = self._keyframe_idx
+        if keyframes is not None and len(keyframes) > 0:
+            pos = int(np.searchsorted(keyframes, frame_index, side="right")) - 1
+            keyframe = int(keyframes[max(pos, 0)])
+            if keyframe_only:
+                # Точный seek прямо на keyframe — его индекс известен
+                frame_index = keyframe
+                keyframe_only = False
+            seek_pts = self._frame_to_pts(keyframe)
+        elif self._pts_origin is None:
+            # Без таблицы кадр ↔ PTS считается от pts первого кадра
+            self._probe_pts_origin()
+
         # PTS
         pts = self._frame_to_pts(frame_index)
         if pts is None:
-            warnings.warn("PyAV: seek failed — could not compute pts value.")
+            warn_once(logger, "PyAV: seek failed — could not compute pts value.")
             return False
 
         # Выполнение seek
         try:
-            # Seek только по ключевым кадрам
-            self._container.seek(pts, any_frame=False, backward=True)
+            # Seek только по ключевым кадрам (pts в единицах time_base потока)
+            self._container.seek(
+                pts if seek_pts is None else seek_pts,
+                any_frame=False, backward=True, stream=self._stream,
+            )
         except Exception as e:
-            warnings.warn(f"PyAV: seek failed — unable to seek: {e}")
+            warn_once(logger, "PyAV: seek failed — unable to seek: %s", str(e))
             return False
 
-        # Успех → обновление состояния
+        # Успех → обновление состояния.
+        # container.seek сам сбрасывает буферы кодека (flush_buffers), а новый итератор
+        # не отдаст кадры, декодированные старым до seek
         self._reset_frame_iterator()
         self._current_frame_id = frame_index
 
+        if keyframe is not None:
+            # С таблицей считаем кадры от keyframe, а не сравниваем pts:
+            # pts декодированных кадров не всегда монотонны (H.264 с B-кадрами в AVI)
+            self._seek_target_pts = None
+            self._resync_frame_id = False
+            self._skip_after_keyframe = frame_index - keyframe
+        elif keyframe_only and self._has_seek_index():
+            self._seek_target_pts = None
+            self._resync_frame_id = True
+            self._skip_after_keyframe = None
+        else:
+            self._seek_target_pts = pts
+            self._resync_frame_id = False
+            self._skip_after_keyframe = None
+
         return True
 
+    def _is_short_forward(self, frame_index: int) -> bool:
+        """
+            Цель впереди не дальше FORWARD_SCAN_THRESHOLD кадров или (с таблицей кадров)
+            до следующего keyframe — seek всё равно начал бы с текущей GOP.
+        """
+        delta = frame_index - self._current_frame_id
+        if delta < 0:
+            return False
+        if delta <= self.FORWARD_SCAN_THRESHOLD:
+            return True
+
+        # Без keyframe между текущей позицией и целью seek всё равно начнёт с текущей GOP
+        keyframes = self._keyframe_idx
+        if keyframes is None or len(keyframes) == 0:
+            return False
+        pos = int(np.searchsorted(keyframes, self._current_frame_id, side="right"))
+        return pos == len(keyframes) or keyframes[pos] > frame_index
+
+    def _scan_forward(self, frame_index: int) -> bool:
+        """
+            Декодирует кадры до frame_index без конвертации (sws_scale).
+            В отличие от BaseDecoder._scan_forward — мимо grab(): при decode-ahead
+            seek выполняется с остановленным потоком, очередь которого читать нельзя.
+            При неуспехе (конец видео) позиция уже сдвинута — вызывающий выполняет обычный seek.
+        """
+        while self._current_frame_id < frame_index:
+            if not self._grab_next():
+                return False
+        return self._current_frame_id == frame_index
+
     def cur_frame_id(self) -> int:
-        """ Текущий индекс кадра (поддерживается вручную). """
+        """ Текущий индекс кадра (поддерживается вручную; при decode-ahead — позиция потребителя). """
+        if self._ahead_queue is not None:
+            return self._consumer_frame_id
         return self._current_frame_id
 
     # ---------------------------------------------------------
@@ -230,15 +605,276 @@ class PyAVDecoder(BaseDecoder):
     def read(self) -> Optional[ndarray]:
         """
             Читает следующий кадр из потока.
-            :return: ndarray (BGR) или None, если конец видео
+            :return: ndarray (config.pix_fmt, по умолчанию BGR) или None, если конец видео
         """
-        if not self._frame_iter:
+        if not self.grab():
             return None
+        return self.retrieve()
+
+    def grab(self) -> bool:
+        """
+            Декодирует следующий кадр, но не переводит его в ndarray.
+            Конвертация в BGR (sws_scale) откладывается до retrieve().
+            При decode-ahead кадр (уже сконвертированный) берётся из очереди.
+        """
+        if self._ahead_queue is not None:
+            return self._pop_ahead()
+        return self._grab_next()
+
+    def _grab_next(self) -> bool:
+        """ Декодирует следующий кадр из потока (с учётом состояния после seek). """
+        if not self._ensure_container() or not self._frame_iter:
+            return False
 
         try:
             frame = next(self._frame_iter)
+
+            # После seek по таблице кадров: ведущие кадры открытого GOP,
+            # затем известное число кадров от keyframe до целевого
+            skip = self._skip_after_keyframe
+            if skip is not None:
+                self._skip_after_keyframe = None
+                skipped = 0
+                while not frame.key_frame and skipped < self.MAX_LEADING_FRAMES:
+                    frame = next(self._frame_iter)
+                    skipped += 1
+                for _ in range(skip):
+                    frame = next(self._frame_iter)
+
+            # После точного seek пропускаем кадры между keyframe и целевым
+            target_pts = self._seek_target_pts
+            if target_pts is not None:
+                frame = self._seek_before_target(frame, target_pts)
+                while frame.pts is not None and frame.pts < target_pts:
+                    frame = next(self._frame_iter)
+                self._seek_target_pts = None
+
+            # После seek по keyframe пропускаем ведущие кадры открытого GOP:
+            # они ссылаются на кадры до seek и декодируются с артефактами
+            if self._resync_frame_id:
+                skipped = 0
+                while not frame.key_frame and skipped < self.MAX_LEADING_FRAMES:
+                    frame = next(self._frame_iter)
+                    skipped += 1
         except StopIteration:
-            return None
+            self._grabbed_frame = None
+            return False
 
+        # После seek по keyframe узнаём фактический индекс кадра
+        if self._resync_frame_id:
+            if frame.pts is not None:
+                self._current_frame_id = self._pts_to_frame(frame.pts)
+            self._resync_frame_id = False
+
+        self._grabbed_frame = frame
         self._current_frame_id += 1
-        return frame.to_ndarray(format="bgr24")
+        return True
+
+    def _seek_before_target(self, frame: av.VideoFrame, target_pts: int) -> av.VideoFrame:
+        """
+            Первый кадр после точного seek уже за целью — seek проскочил её:
+            индекс AVI ведётся по dts, а pts keyframe больше dts, поэтому seek к pts цели
+            перед keyframe попадает на сам keyframe. Отступаем назад, удваивая шаг.
+            :return: первый кадр после последнего seek
+        """
+        back = 0
+        for _ in range(self.MAX_SEEK_RETRIES):
+            if frame.pts is None or frame.pts <= target_pts:
+                break
+            back = max(2 * back, frame.pts - target_pts)
+            try:
+                self._container.seek(target_pts - back, any_frame=False, backward=True, stream=self._stream)
+            except Exception as e:
+                warn_once(logger, "PyAV: seek retry failed: %s", str(e))
+                break
+            self._reset_frame_iterator()
+            frame = next(self._frame_iter)
+        return frame
+
+    def read_raw(self) -> Optional[av.VideoFrame]:
+        """
+            Читает следующий кадр как av.VideoFrame — без to_ndarray() и конвертации цвета.
+            Для конвейеров, которые сами переводят кадр (например, на GPU).
+            При decode-ahead кадры конвертирует поток — возвращается кадр в config.pix_fmt.
+        """
+        if not self.grab():
+            return None
+        if self._ahead_queue is not None:
+            return self._ahead_frame
+        return self._grabbed_frame
+
+    def read_y_plane(self) -> Optional[ndarray]:
+        """
+            Читает следующий кадр и возвращает только яркость (H, W) uint8 —
+            для моделей на градациях серого.
+            Для YUV-кадров (и gray) это view плоскости Y декодированного кадра:
+            без sws_scale и без копирования, треть объёма yuv420p и девятая часть BGR.
+            Значения — как в потоке: для limited range это 16..235, без растяжения
+            до 0..255, которое делает sws_scale (pix_fmt "gray").
+            Массив может быть не C-contiguous (выравнивание строк) — при необходимости
+            np.ascontiguousarray(). Для остальных форматов — sws_scale в gray.
+            При decode-ahead кадры конвертирует поток, поэтому нужен pix_fmt "gray" или "raw"
+            (иначе ValueError — до чтения, кадр не теряется).
+        """
+        ahead = self._ahead_queue is not None
+        if ahead and self._config.pix_fmt not in ("gray", "raw"):
+            raise ValueError("PyAV: read_y_plane with decode_ahead requires pix_fmt 'gray' or 'raw'")
+
+        if not self.grab():
+            return None
+
+        if ahead:
+            # Кадры уже сконвертированы потоком decode-ahead
+            frame = self._ahead_frame
+            if isinstance(frame, av.VideoFrame):
+                return self._to_luma(frame)
+            return frame
+
+        return self._to_luma(self._grabbed_frame)
+
+    def _to_luma(self, frame: av.VideoFrame) -> ndarray:
+        """ Яркость кадра: view плоскости Y, если она есть, иначе sws_scale в gray. """
+        if _has_luma_plane(frame.format.name):
+            return _luma_view(frame)
+        return self._reformatter.reformat(frame, format="gray").to_ndarray()
+
+    def retrieve(self) -> Optional[ndarray]:
+        """
+            Конвертирует кадр, захваченный grab(), в ndarray формата config.pix_fmt.
+            Для yuv420p конвертации цвета нет — плоскости копируются как есть;
+            для "raw" возвращается сам av.VideoFrame.
+        """
+        if self._ahead_queue is not None:
+            return self._ahead_frame
+        return self._convert_grabbed()
+
+    def _convert_grabbed(self) -> Optional[ndarray]:
+        """ Конвертирует _grabbed_frame в формат config.pix_fmt. """
+        if self._grabbed_frame is None:
+            return None
+        if self._raw_output:
+            return self._grabbed_frame
+
+        pix_fmt = self._config.pix_fmt
+        frame = self._reformatter.reformat(self._grabbed_frame, format=pix_fmt)
+        if not self._reuse_output:
+            return frame.to_ndarray()
+        return self._copy_to_out_buf(frame, _PACKED_CHANNELS[pix_fmt])
+
+    def _copy_to_out_buf(self, frame: av.VideoFrame, channels: int) -> ndarray:
+        """
+            Копирует упакованный кадр в общий выходной массив (создаётся по первому кадру).
+            Возвращается сам массив — он перезаписывается следующим кадром.
+        """
+        plane = frame.planes[0]
+        height, width = frame.height, frame.width
+
+        out = self._out_buf
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        if out is None or out.shape != shape:
+            out = self._out_buf = np.empty(shape, dtype=np.uint8)
+
+        # Строки плоскости могут быть выровнены (line_size >= width * channels)
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(height, plane.line_size)
+        np.copyto(out.reshape(height, width * channels), rows[:, :width * channels])
+        return out
+
+    def sample(self, indices):
+        """ Кадры выборки живут одновременно — общий выходной буфер здесь не используется. """
+        reuse, self._reuse_output = self._reuse_output, False
+        try:
+            return super().sample(indices)
+        finally:
+            self._reuse_output = reuse
+
+    # ---------------------------------------------------------
+    # Decode-ahead
+    # ---------------------------------------------------------
+
+    def _start_decode_ahead(self) -> None:
+        """ Запускает поток, декодирующий кадры вперёд от текущей позиции. """
+        self._stop_decode_ahead()
+        self._consumer_frame_id = self._current_frame_id
+        self._ahead_frame = None
+        self._ahead_queue = queue.Queue(maxsize=self._decode_ahead)
+        # Своё событие на каждый поток: поток, брошенный в _stop_decode_ahead,
+        # не должен ожить при следующем запуске
+        self._ahead_stop = threading.Event()
+        self._ahead_thread = threading.Thread(target=self._decode_ahead_loop, daemon=True)
+        self._ahead_thread.start()
+
+    def _stop_decode_ahead(self) -> None:
+        """
+            Останавливает поток decode-ahead и отбрасывает кадры в очереди.
+            Поток проверяет stop каждые 50 мс и после каждого кадра, но может зависнуть
+            в demux (сетевой поток без данных). Если он не вышел за AHEAD_JOIN_TIMEOUT,
+            декодер отцепляется от контейнера и становится непригодным до open():
+            закрывать контейнер под работающим в нём FFmpeg нельзя, а продолжать
+            (seek, новый поток), пока поток трогает кодек, — тоже.
+        """
+        thread = self._ahead_thread
+        if thread is None:
+            return
+
+        self._ahead_stop.set()
+        # Освобождаем место, если поток ждёт в put()
+        self._drain_ahead_queue()
+        thread.join(timeout=self.AHEAD_JOIN_TIMEOUT)
+        self._drain_ahead_queue()
+        self._ahead_thread = None
+
+        if thread.is_alive():
+            logger.warning("PyAV: decode-ahead thread is blocked; decoder is unusable until reopened.")
+            # Контейнер закроется сборщиком мусора, когда поток отпустит его
+            self._container = None
+            self._stream = None
+            self._frame_iter = None
+            self._ahead_queue = None
+            self._opened = False
+
+    def _drain_ahead_queue(self) -> None:
+        """ Отбрасывает все кадры, накопленные в очереди decode-ahead. """
+        try:
+            while True:
+                self._ahead_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _decode_ahead_loop(self) -> None:
+        """
+            Цикл потока decode-ahead: декодирует и конвертирует кадры в очередь.
+            Ограниченная очередь — обратное давление: поток ждёт, пока потребитель не заберёт кадр.
+        """
+        ahead_queue = self._ahead_queue
+        stop = self._ahead_stop
+
+        while not stop.is_set():
+            try:
+                item = (self._current_frame_id, self._convert_grabbed()) if self._grab_next() else None
+            except Exception as e:
+                warn_once(logger, "PyAV: decode-ahead stopped: %s", str(e))
+                item = None
+
+            # Кладём с таймаутом, чтобы не пропустить остановку
+            while not stop.is_set():
+                try:
+                    ahead_queue.put(item, timeout=0.05)
+                    break
+                except queue.Full:
+                    continue
+
+            if item is None:
+                # конец видео
+                return
+
+    def _pop_ahead(self) -> bool:
+        """ Забирает следующий кадр из очереди decode-ahead. """
+        item = self._ahead_queue.get()
+        if item is None:
+            # Конец видео остаётся концом и для следующих вызовов
+            self._ahead_queue.put(None)
+            self._ahead_frame = None
+            return False
+
+        self._consumer_frame_id, self._ahead_frame = item
+        return True
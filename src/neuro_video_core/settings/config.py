@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 from ..decoders.decoder_type import DecoderType
 
@@ -16,16 +17,55 @@ class VideoCoreConfig:
 
     # RingBuffer:
     # 0  → буфер выключен
-    # >0 → включён, capacity = buffer_size
+    # >0 → включён, capacity = buffer_size (округляется вверх до степени двойки)
     buffer_size: int = 0
 
+    # Упреждающее чтение (prefetch) вокруг текущей позиции.
+    # Требует buffer_size > 0 (окно = buffer_size) и несовместимо с async_enabled.
+    prefetch_enabled: bool = False
+    # Доля окна впереди текущего кадра; остальное — кадры позади (для перехода назад)
+    front_back_ratio: float = 0.75
+
+    # Формат выдаваемых кадров (имя формата FFmpeg):
+    # "bgr24" (по умолчанию), "rgb24", "gray" или "yuv420p" —
+    # планарный I420 формы (H * 3 / 2, W), 1.5 байта на пиксель без конвертации цвета.
+    # "raw" — av.VideoFrame как есть, без to_ndarray() (только PyAV; буфер такие кадры не хранит).
+    # Форматы, отличные от bgr24, PyAV отдаёт без sws_scale в BGR;
+    # HybridDecoder в этом случае читает кадры через PyAV.
+    pix_fmt: str = "bgr24"
+    # PyAVDecoder: писать каждый кадр (bgr24 / rgb24 / gray) в один предвыделенный массив
+    # вместо нового ndarray. Возвращаемый кадр перезаписывается следующим чтением —
+    # для хранения нужен .copy(). Игнорируется при decode_ahead и prefetch_enabled
+    reuse_output: bool = False
+    # PyAVDecoder: сколько кадров фоновый поток декодирует заранее (0 — выключено).
+    # Декодирование идёт параллельно с обработкой предыдущего кадра вызывающим кодом
+    decode_ahead: int = 0
+    # PyAVDecoder: число потоков кодека FFmpeg (0 — по числу CPU)
+    decode_threads: int = 0
+
     # Асинхронное чтение кадров
     async_enabled: bool = False
     # Задержка между чтениями в AsyncFrameReader (секунды)
     poll_delay: float = 0.0
+    # Номер CPU, к которому привязывается поток AsyncFrameReader (с повышенным приоритетом).
+    # None — без привязки, поток планируется ОС как обычно
+    async_cpu: Optional[int] = None
 
     # Строгий режим ошибок
     strict_mode: bool = True
 
-    # Влияние на HybridDecoder (на будущее)
+    # PyAVDecoder: при open() построить таблицу кадр → PTS по пакетам контейнера
+    # (без декодирования). Точный seek для VFR и B-кадров ценой однократного прохода по файлу
+    seek_index: bool = False
+
+    # OpenCVDecoder: если seek остановился раньше цели (на keyframe),
+    # дочитывать до неё grab() — точный seek без PyAV
     force_opencv_seek: bool = False
+
+    # Влияние на HybridDecoder
+    # HybridDecoder: выполнять seek сначала через PyAV (точная временная шкала),
+    # а не только через OpenCV, который читает кадры
+    precise_timeline: bool = False
+    # HybridDecoder: при скраббинге (частая смена направления переходов)
+    # выполнять seek по keyframe, жертвуя точностью ради скорости
+    scrub_detection: bool = False
@@ -1,4 +1,4 @@
-from neuro_video_core.decoders.opencv_decoder import OpenCVDecoder
-from neuro_video_core.decoders.pyav_decoder import PyAVDecoder
+from .file_source import FileSource
+from .source_type import SourceType
 
-__all__ = ["OpenCVDecoder", "PyAVDecoder"]
+__all__ = ["FileSource", "SourceType"]
@@ -1,7 +1,9 @@
+import os
 from pathlib import Path
 from typing import Union
 
 from .base_source import BaseSource
+from .source_type import SourceType
 
 
 class FileSource(BaseSource):
@@ -18,11 +20,29 @@ class FileSource(BaseSource):
         """
             :param path: путь к видео-файлу
         """
-        self._path: Path = Path(path).expanduser().resolve()
+        uri = str(path)
 
-        if not self._path.exists():
-            raise FileNotFoundError(f"Video file does not exist: {self._path}")
+        # Тип источника определяется один раз — по исходной строке
+        self._source_type: SourceType = SourceType.detect(uri)
+
+        if self._source_type is not SourceType.FILE:
+            # URI / камера: на диске проверять нечего, строка остаётся как есть
+            self._uri: str = uri
+            return
+
+        # Абсолютный путь без resolve() (обход симлинков — лишние системные вызовы),
+        # существование — одним stat()
+        self._uri = os.path.abspath(os.path.expanduser(uri))
+        try:
+            os.stat(self._uri)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Video file does not exist: {self._uri}") from None
 
     def get_uri(self) -> str:
-        """ Возвращает абсолютный путь к файлу. """
-        return str(self._path)
+        """ Возвращает абсолютный путь к файлу (для URI и камер — исходную строку). """
+        return self._uri
+
+    @property
+    def source_type(self) -> SourceType:
+        """ Тип источника, определённый по пути при создании. """
+        return self._source_type
@@ -1,4 +1,21 @@
+import re
 from enum import Enum
+from functools import lru_cache
+
+# Классификатор источника за один проход: индекс камеры / устройство V4L2 или схема URI
+_CLASSIFIER = re.compile(
+    r"^\s*(?:(?P<camera>(?:\d+|/dev/video\d+)\s*$)|(?P<scheme>[a-z][a-z0-9+.-]*)://)",
+    re.IGNORECASE,
+)
+
+# Схема URI → значение SourceType
+_SCHEME_TYPES = {
+    "rtsp": "rtsp",
+    "rtsps": "rtsp",
+    "http": "http",
+    "https": "https",
+    "s3": "s3",
+}
 
 
 class SourceType(Enum):
@@ -14,10 +31,31 @@ class SourceType(Enum):
     S3 = "s3"
     PIPE = "pipe"
 
+    @classmethod
+    def detect(cls, source: str) -> "SourceType":
+        """
+            Определяет тип источника по строке пути / URI:
+            rtsp:// , http(s):// , s3:// — по схеме;
+            индекс камеры ("0") или /dev/videoN — CAMERA;
+            остальное — FILE.
+            Классификация — один предкомпилированный regex, результат кешируется по строке.
+        """
+        return cls(_classify(source))
+
     @property
     def is_supported(self) -> bool:
-        return self in {
-            SourceType.FILE,
-            SourceType.RTSP,
-            SourceType.CAMERA,
-        }
+        return self in _SUPPORTED
+
+
+_SUPPORTED = frozenset({SourceType.FILE, SourceType.RTSP, SourceType.CAMERA})
+
+
+@lru_cache(maxsize=1024)
+def _classify(source: str) -> str:
+    """ Значение SourceType для строки источника (результат кешируется). """
+    match = _CLASSIFIER.match(source)
+    if match is None:
+        return SourceType.FILE.value
+    if match.group("camera"):
+        return SourceType.CAMERA.value
+    return _SCHEME_TYPES.get(match.group("scheme").lower(), SourceType.FILE.value)
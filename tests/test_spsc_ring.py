@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from neuro_video_core.async_reader.spsc_ring import SpscRing
+
+
+def _frame(value: int) -> np.ndarray:
+    return np.full((4, 4), value, dtype=np.int64)
+
+
+def test_capacity_rounded_to_power_of_two():
+    assert SpscRing(3).capacity() == 4
+    assert SpscRing(4).capacity() == 4
+    with pytest.raises(ValueError):
+        SpscRing(0)
+
+
+def test_pop_fifo_order():
+    ring = SpscRing(4)
+    for i in range(3):
+        ring.push(i)
+
+    assert [ring.pop() for _ in range(3)] == [0, 1, 2]
+    assert ring.pop() is None
+
+
+def test_lap_resumes_at_oldest_readable():
+    ring = SpscRing(4)
+    for i in range(10):
+        ring.push(i)
+
+    # Доступны только capacity - 1 последних элементов
+    assert ring.size() == 3
+    assert [ring.pop() for _ in range(3)] == [7, 8, 9]
+    assert ring.pop() is None
+
+
+def test_last_returns_newest_without_consuming():
+    ring = SpscRing(4)
+    assert ring.last() is None
+
+    ring.push(1)
+    ring.push(2)
+    assert ring.last() == 2
+    assert ring.size() == 2
+
+
+def test_pop_returns_copy_of_preallocated_slot():
+    ring = SpscRing(4)
+    ring.allocate((4, 4), np.int64)
+    for i in range(3):
+        ring.push(_frame(i))
+
+    first = ring.pop()
+    # Писатель проходит полный круг — слот first перезаписан
+    for i in range(3, 7):
+        ring.push(_frame(i))
+
+    assert (first == 0).all()
+
+
+def test_pop_order_after_lap_with_preallocated_slots():
+    ring = SpscRing(4)
+    ring.allocate((4, 4), np.int64)
+    for i in range(10):
+        ring.push(_frame(i))
+
+    assert [int(ring.pop()[0, 0]) for _ in range(3)] == [7, 8, 9]
+
+
+def test_reset_keeps_allocation():
+    ring = SpscRing(2)
+    ring.allocate((4, 4), np.int64)
+    ring.push(_frame(5))
+    ring.reset()
+
+    assert ring.pop() is None
+    assert ring.last() is None
+
+    ring.push(_frame(6))
+    assert int(ring.last()[0, 0]) == 6
@@ -5,17 +5,21 @@ class TimerContext:
     """
         Контекстный менеджер, измеряющий время выполнения блока.
         Сам по себе он статистику не хранит — только передаёт её менеджеру.
+        Время измеряется целыми наносекундами (time.perf_counter_ns) — без округления float.
     """
 
+    __slots__ = ("name", "manager", "t0", "_clock")
+
     def __init__(self, name: str, manager):
         self.name = name
         self.manager = manager
-        self.t0 = 0.0
+        self.t0 = 0
+        self._clock = time.perf_counter_ns
 
     def __enter__(self):
-        self.t0 = time.perf_counter()
+        self.t0 = self._clock()
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        elapsed = time.perf_counter() - self.t0
-        self.manager.add_time(self.name, elapsed)
+        elapsed_ns = self._clock() - self.t0
+        self.manager.add_time_ns(self.name, elapsed_ns)
@@ -1,5 +1,6 @@
+import threading
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 from .timer_stats import TimerStats
 from .timer_context import TimerContext
@@ -9,11 +10,32 @@ class TimerManager:
     """
         Главный менеджер таймеров.
         Собирает, агрегирует и выводит статистику.
+
+        Каждый поток пишет измерения в свой словарь TimerStats — без общих
+        структур и блокировок на горячем пути; словари потоков сливаются
+        только при чтении (stats, print_summary).
     """
 
-    def __init__(self, log_file: Optional[str | Path] = None):
-        self.stats: Dict[str, TimerStats] = {}
+    __slots__ = ("_local", "_lock", "_thread_stats", "log_file", "keep_times", "max_times")
+
+    def __init__(
+            self,
+            log_file: Optional[str | Path] = None,
+            keep_times: bool = False,
+            max_times: int = 1024,
+    ):
+        """
+            :param log_file: файл, в который дописывается сводка print_summary()
+            :param keep_times: хранить измерения (TimerStats.times), а не только агрегаты
+            :param max_times: сколько последних измерений хранить на имя блока (и поток)
+        """
+        self._local = threading.local()
+        # Словари статистики всех потоков (регистрируются при первом измерении в потоке)
+        self._lock = threading.Lock()
+        self._thread_stats: List[Dict[str, TimerStats]] = []
         self.log_file = Path(log_file) if log_file else None
+        self.keep_times = keep_times
+        self.max_times = max_times
 
     # ---------------------------------------------------------
     # Создание таймера
@@ -28,10 +50,49 @@ class TimerManager:
     # ---------------------------------------------------------
 
     def add_time(self, name: str, elapsed: float):
-        """Добавляет одно измерение по указанному имени блока."""
-        if name not in self.stats:
-            self.stats[name] = TimerStats()
-        self.stats[name].times.append(elapsed)
+        """Добавляет одно измерение (в секундах) по указанному имени блока."""
+        self.add_time_ns(name, round(elapsed * 1e9))
+
+    def add_time_ns(self, name: str, elapsed_ns: int):
+        """Добавляет одно измерение в наносекундах (используется TimerContext)."""
+        try:
+            stats = self._local.stats
+        except AttributeError:
+            stats = self._register_thread()
+
+        stat = stats.get(name)
+        if stat is None:
+            stat = stats[name] = TimerStats(self.keep_times, self.max_times)
+        stat.add(elapsed_ns)
+
+    def _register_thread(self) -> Dict[str, TimerStats]:
+        """Создаёт словарь статистики текущего потока."""
+        stats = self._local.stats = {}
+        with self._lock:
+            self._thread_stats.append(stats)
+        return stats
+
+    def reset(self):
+        """Удаляет всю накопленную статистику."""
+        with self._lock:
+            for stats in self._thread_stats:
+                stats.clear()
+
+    @property
+    def stats(self) -> Dict[str, TimerStats]:
+        """Статистика по именам блоков, слитая по всем потокам (новый словарь на каждый вызов)."""
+        merged: Dict[str, TimerStats] = {}
+        with self._lock:
+            thread_stats = list(self._thread_stats)
+
+        for stats in thread_stats:
+            # list() — снимок: поток может добавить имя во время слияния
+            for name, stat in list(stats.items()):
+                total = merged.get(name)
+                if total is None:
+                    total = merged[name] = TimerStats(self.keep_times, self.max_times)
+                total.merge(stat)
+        return merged
 
     # ---------------------------------------------------------
     # Вывод статистики
@@ -46,7 +107,9 @@ class TimerManager:
                 "avg"   — по среднему
                 "max"   — по максимуму
         """
-        if not self.stats:
+        # Слияние по потокам — один раз на сводку
+        stats = self.stats
+        if not stats:
             print("[TimerManager] No stats collected.")
             return
 
@@ -62,7 +125,7 @@ class TimerManager:
         else:
             key_fn = lambda item: item[1].total
 
-        for name, stat in sorted(self.stats.items(), key=key_fn, reverse=True):
+        for name, stat in sorted(stats.items(), key=key_fn, reverse=True):
             print(
                 f"{name:25s} | "
                 f"count: {stat.count:5d} | "
@@ -73,21 +136,21 @@ class TimerManager:
             )
 
         if self.log_file:
-            self._save_to_log()
+            self._save_to_log(stats)
 
-    def _save_to_log(self):
+    def _save_to_log(self, stats: Dict[str, TimerStats]):
         """Сохраняет статистику в лог-файл."""
         try:
             self.log_file.parent.mkdir(parents=True, exist_ok=True)
             with self.log_file.open("a", encoding="utf8") as f:
-                f.write(self._as_text())
+                f.write(self._as_text(stats))
         except Exception as e:
             print(f"[TimerManager] Failed to write log: {e}")
 
-    def _as_text(self) -> str:
+    def _as_text(self, stats: Dict[str, TimerStats]) -> str:
         """Форматирует статистику в многострочный текст."""
         lines = ["TIMER SUMMARY\n"]
-        for name, stat in self.stats.items():
+        for name, stat in stats.items():
             lines.append(
                 f"{name:25s} | "
                 f"count={stat.count} total={stat.total:.6f} "
@@ -1,35 +1,75 @@
+from collections import deque
+
+# Перевод наносекунд в секунды (выполняется только при чтении статистики)
+NS_TO_S = 1e-9
+
+
 class TimerStats:
     """
         Хранилище статистики по одному имени блока.
         Содержит:
-        * индивидуальные измерения
+        * количество измерений
         * сумму
         * min
         * max
         * среднее
+        * последние max_times измерений — только при keep_times=True (например, для перцентилей)
+
+        Агрегаты обновляются при каждом add() за O(1) в целых наносекундах;
+        свойства возвращают секунды (float) — перевод выполняется только при чтении.
     """
 
-    __slots__ = ("times",)
+    __slots__ = ("_count", "_total_ns", "_min_ns", "_max_ns", "times")
+
+    def __init__(self, keep_times: bool = False, max_times: int = 1024):
+        self._count = 0
+        self._total_ns = 0
+        self._min_ns = 0
+        self._max_ns = 0
+        # Последние измерения в наносекундах (None — не хранятся).
+        # Кольцевой буфер: память не растёт на долгоживущих процессах
+        self.times = deque(maxlen=max_times) if keep_times else None
+
+    def add(self, elapsed_ns: int) -> None:
+        """ Добавляет одно измерение (в наносекундах). """
+        if self._count == 0 or elapsed_ns < self._min_ns:
+            self._min_ns = elapsed_ns
+        if elapsed_ns > self._max_ns:
+            self._max_ns = elapsed_ns
+        self._count += 1
+        self._total_ns += elapsed_ns
+        if self.times is not None:
+            self.times.append(elapsed_ns)
 
-    def __init__(self):
-        self.times = []
+    def merge(self, other: "TimerStats") -> None:
+        """ Добавляет к статистике агрегаты (и измерения) другого TimerStats. """
+        if other._count == 0:
+            return
+        if self._count == 0 or other._min_ns < self._min_ns:
+            self._min_ns = other._min_ns
+        if other._max_ns > self._max_ns:
+            self._max_ns = other._max_ns
+        self._count += other._count
+        self._total_ns += other._total_ns
+        if self.times is not None and other.times is not None:
+            self.times.extend(other.times)
 
     @property
     def count(self) -> int:
-        return len(self.times)
+        return self._count
 
     @property
     def total(self) -> float:
-        return sum(self.times)
+        return self._total_ns * NS_TO_S
 
     @property
     def avg(self) -> float:
-        return self.total / self.count if self.count else 0.0
+        return self._total_ns * NS_TO_S / self._count if self._count else 0.0
 
     @property
     def min(self) -> float:
-        return min(self.times) if self.count else 0.0
+        return self._min_ns * NS_TO_S
 
     @property
     def max(self) -> float:
-        return max(self.times) if self.count else 0.0
+        return self._max_ns * NS_TO_S